@@ -0,0 +1,247 @@
+import json
+from datetime import datetime, timedelta
+
+from flask import Blueprint, Response, abort, request
+
+from models import db, Area, Venue, Artist, Show
+import bookings
+
+try:
+    import orjson
+except ImportError:  # pinned in requirements.txt; plain json still works
+    orjson = None
+
+# ----------------------------------------------------------------------------#
+# Read API, version 1.
+#
+# Every endpoint selects plain Core rows (no ORM instances are hydrated) and
+# only the columns asked for with ?fields=a,b,c. Lists are keyset-paginated
+# with ?after=<last id>&limit=<n>.
+# ----------------------------------------------------------------------------#
+
+api = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+venue = Venue.__table__
+artist = Artist.__table__
+area = Area.__table__
+show = Show.__table__
+
+VENUE_FIELDS = {
+    'id': venue.c.id,
+    'name': venue.c.name,
+    'city': area.c.city,
+    'state': area.c.state,
+    'address': venue.c.address,
+    'phone': venue.c.phone,
+    'genres': venue.c.genres,
+    'image_link': venue.c.image_link,
+    'facebook_link': venue.c.facebook_link,
+    'website': venue.c.website,
+    'seeking_talent': venue.c.seeking_talent,
+    'seeking_description': venue.c.seeking_description,
+    'num_upcoming_shows': venue.c.num_upcoming_shows,
+}
+
+ARTIST_FIELDS = {
+    'id': artist.c.id,
+    'name': artist.c.name,
+    'city': area.c.city,
+    'state': area.c.state,
+    'phone': artist.c.phone,
+    'genres': artist.c.genres,
+    'image_link': artist.c.image_link,
+    'facebook_link': artist.c.facebook_link,
+    'num_upcoming_shows': artist.c.num_upcoming_shows,
+}
+
+SHOW_FIELDS = {
+    'id': show.c.id,
+    'venue_id': show.c.venue_id,
+    'venue_name': venue.c.name,
+    'artist_id': show.c.artist_id,
+    'artist_name': artist.c.name,
+    'artist_image_link': artist.c.image_link,
+    'start_time': show.c.start_time,
+    'end_time': show.c.end_time,
+}
+
+# extra fields on the venue/artist detail routes, each costing one query
+SHOW_LIST_FIELDS = ('past_shows', 'upcoming_shows')
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, default=_json_default, separators=(',', ':'))
+
+
+def json_response(data, status=200):
+    return Response(dumps(data), status=status, mimetype='application/json')
+
+
+def requested_fields(available, extra=()):
+    # ?fields=id,name -> ['id', 'name']; everything when absent
+    fields = request.args.get('fields')
+    if fields is None:
+        return list(available) + list(extra)
+    fields = [field.strip() for field in fields.split(',') if field.strip()]
+    if not fields:
+        abort(400, description='fields must name at least one field')
+    unknown = [field for field in fields if field not in available and field not in extra]
+    if unknown:
+        abort(400, description='unknown fields: ' + ', '.join(unknown))
+    return fields
+
+
+def page_args():
+    try:
+        after = int(request.args.get('after', 0))
+        limit = min(int(request.args.get('limit', DEFAULT_LIMIT)), MAX_LIMIT)
+    except ValueError:
+        abort(400, description='after and limit must be integers')
+    return after, max(limit, 1)
+
+
+def select_fields(columns, fields):
+    # always select the id so pages can be keyed on it
+    names = list(dict.fromkeys(['id'] + [f for f in fields if f in columns]))
+    return names, db.select(*[columns[name].label(name) for name in names])
+
+
+def rows_to_dicts(names, fields, rows):
+    return [{name: value for name, value in zip(names, row) if name in fields}
+            for row in rows]
+
+
+def list_page(columns, from_, id_column):
+    fields = requested_fields(columns)
+    after, limit = page_args()
+    names, query = select_fields(columns, fields)
+    rows = db.session.execute(
+        query.select_from(from_).where(id_column > after).order_by(id_column).limit(limit)
+    ).all()
+    return json_response({
+        "data": rows_to_dicts(names, fields, rows),
+        "next": rows[-1][0] if len(rows) == limit else None,
+    })
+
+
+def detail(columns, from_, id_column, id, extra=()):
+    fields = requested_fields(columns, extra)
+    names, query = select_fields(columns, fields)
+    row = db.session.execute(query.select_from(from_).where(id_column == id)).first()
+    if row is None:
+        abort(404)
+    return fields, rows_to_dicts(names, fields, [row])[0]
+
+
+def show_lists(data, fields, owner_column, owner_id, partner_columns, partner_join):
+    # past/upcoming show lists for a venue or artist detail, only if asked for
+    if not set(fields) & set(SHOW_LIST_FIELDS):
+        return data
+    now = datetime.now()
+    rows = db.session.execute(
+        db.select(show.c.start_time, *partner_columns)
+        .select_from(show.join(*partner_join))
+        .where(owner_column == owner_id, show.c.start_time.isnot(None))
+        .order_by(show.c.start_time)
+    ).all()
+    names = ['start_time'] + [column.name for column in partner_columns]
+    past = [dict(zip(names, row)) for row in rows if row[0] < now]
+    upcoming = [dict(zip(names, row)) for row in rows if row[0] >= now]
+    if 'past_shows' in fields:
+        data['past_shows'] = past
+    if 'upcoming_shows' in fields:
+        data['upcoming_shows'] = upcoming
+    return data
+
+
+@api.route('/venues')
+def venues():
+    return list_page(VENUE_FIELDS, venue.join(area), venue.c.id)
+
+
+@api.route('/venues/<int:venue_id>')
+def venue_detail(venue_id):
+    fields, data = detail(VENUE_FIELDS, venue.join(area), venue.c.id, venue_id,
+                          SHOW_LIST_FIELDS)
+    return json_response(show_lists(
+        data, fields, show.c.venue_id, venue_id,
+        [artist.c.id.label('artist_id'), artist.c.name.label('artist_name'),
+         artist.c.image_link.label('artist_image_link')],
+        (artist, show.c.artist_id == artist.c.id)))
+
+
+@api.route('/venues/<int:venue_id>/availability')
+def venue_availability(venue_id):
+    # ?start=2026-11-01&end=2026-12-01[&min_minutes=120]: the venue's free
+    # slots over [start, end), from one query
+    try:
+        start = datetime.fromisoformat(request.args['start'])
+        end = datetime.fromisoformat(request.args['end'])
+        min_length = timedelta(minutes=int(request.args.get('min_minutes', 0)))
+    except KeyError:
+        abort(400, description='start and end are required')
+    except ValueError:
+        abort(400, description='start and end must be ISO 8601, min_minutes an integer')
+    if start.tzinfo is not None or end.tzinfo is not None:
+        # show times are stored naive, with no zone to convert an offset to
+        abort(400, description='start and end must not carry a UTC offset')
+    if not start < end <= start + bookings.MAX_AVAILABILITY_RANGE:
+        abort(400, description='end must be after start and at most '
+                               f'{bookings.MAX_AVAILABILITY_RANGE.days} days later')
+    slots = bookings.free_slots(venue_id, start, end, min_length)
+    if slots is None:
+        abort(404)
+    return json_response({
+        "venue_id": venue_id,
+        "start": start,
+        "end": end,
+        "free": [{"start": free_from, "end": free_until} for free_from, free_until in slots],
+    })
+
+
+@api.route('/artists')
+def artists():
+    return list_page(ARTIST_FIELDS, artist.outerjoin(area), artist.c.id)
+
+
+@api.route('/artists/<int:artist_id>')
+def artist_detail(artist_id):
+    fields, data = detail(ARTIST_FIELDS, artist.outerjoin(area), artist.c.id, artist_id,
+                          SHOW_LIST_FIELDS)
+    return json_response(show_lists(
+        data, fields, show.c.artist_id, artist_id,
+        [venue.c.id.label('venue_id'), venue.c.name.label('venue_name'),
+         venue.c.image_link.label('venue_image_link')],
+        (venue, show.c.venue_id == venue.c.id)))
+
+
+SHOW_FROM = show.join(venue, show.c.venue_id == venue.c.id) \
+                .join(artist, show.c.artist_id == artist.c.id)
+
+
+@api.route('/shows')
+def shows():
+    return list_page(SHOW_FIELDS, SHOW_FROM, show.c.id)
+
+
+@api.route('/shows/<int:show_id>')
+def show_detail(show_id):
+    fields, data = detail(SHOW_FIELDS, SHOW_FROM, show.c.id, show_id)
+    return json_response(data)
+
+
+@api.errorhandler(400)
+@api.errorhandler(404)
+def api_error(error):
+    return json_response({"error": error.code, "message": error.description}, error.code)
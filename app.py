@@ -2,32 +2,95 @@
 # Imports
 # ----------------------------------------------------------------------------#
 
-from os import abort
-import dateutil.parser
-import babel
-from flask import Flask, jsonify, render_template, request, Response, flash, redirect, url_for
+from flask import Flask, Blueprint, current_app, jsonify, render_template, request, Response, flash, redirect, url_for, stream_template, make_response, stream_with_context, abort
 from flask_moment import Moment
-from flask_sqlalchemy import SQLAlchemy
 import logging
 from logging import Formatter, FileHandler
-from forms import *
-from flask_migrate import Migrate
+from werkzeug.local import LocalProxy
+import os
 import sys
+import json
+from werkzeug.datastructures import MultiDict
+import hashlib
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.exc import IntegrityError
 from models import *
+import search
+import counters
+import genres
+import directory
+import bookings
+import cache
+import exporter
+import api
+import pool
+import instrumentation
+import loadtest
+import templates_cache
+from areas import resolve_area_id, resolve_area_ids
+import click
 
 # ----------------------------------------------------------------------------#
 # App Config.
 # ----------------------------------------------------------------------------#
 
-app = Flask(__name__)
-moment = Moment(app)
-app.config.from_object('config')
-db.init_app(app)
-#db = SQLAlchemy(app)
-migrate = Migrate(app, db)
+# Nothing here touches the database or builds an app: importing this module is
+# cheap, and every worker, CLI run or test gets its app from create_app().
+# Schema changes go through migrations (`flask db upgrade`); `flask
+# create-schema` is there for throwaway SQLite databases. Imports only some
+# requests or commands need (babel, dateutil, the forms, alembic, the CLI
+# tools) happen where they are used.
+
+moment = Moment()
+main = Blueprint('main', __name__, cli_group=None)
+
+# heavy modules that must not load when the app module is imported
+DEFERRED_IMPORTS = ('babel', 'dateutil', 'flask_migrate', 'alembic', 'flask_wtf', 'wtforms',
+                    'forms', 'importer', 'seed', 'benchmark')
+# what importing them may cost, interpreter start-up included
+IMPORT_TIME_BUDGET_MS = 1000
+
+# venue/artist detail payloads, keyed 'venue:<id>' / 'artist:<id>'
+detail_cache = LocalProxy(lambda: current_app.extensions['detail_cache'])
+
+
+def create_app(config='config'):
+    app = Flask(__name__)
+    app.config.from_object(config)
+    # rows fetched per round trip when streaming /shows
+    app.config.setdefault('SHOWS_STREAM_BATCH_SIZE', 500)
+
+    moment.init_app(app)
+    pool.init_app(app, db)
+    db.init_app(app)
+    pool.dispose_after_fork(app, db)
+    instrumentation.init_app(app)
+    genres.init_app(app)
+    directory.init_app(app)
+    loadtest.init_app(app)
+    templates_cache.init_app(app)
+    if click.get_current_context(silent=True) is not None:
+        # only the `flask` command needs `flask db`, and alembic is slow to import
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
+    app.extensions['detail_cache'] = cache.create_cache(app.config)
+    app.jinja_env.filters['datetime'] = format_datetime
+    app.register_blueprint(main)
+    app.register_blueprint(api.api)
+
+    if not app.debug:
+        file_handler = FileHandler('error.log')
+        file_handler.setFormatter(
+            Formatter(
+                '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
+        )
+        app.logger.setLevel(logging.INFO)
+        file_handler.setLevel(logging.INFO)
+        app.logger.addHandler(file_handler)
+        app.logger.info('errors')
 
-with app.app_context():
-    db.create_all()
+    return app
 
 # ----------------------------------------------------------------------------#
 # Filters.
@@ -35,51 +98,148 @@ with app.app_context():
 
 
 def format_datetime(value, format='medium'):
-    date = dateutil.parser.parse(value)
-    if format == 'full':
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == 'medium':
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format, locale='en')
-
-
-app.jinja_env.filters['datetime'] = format_datetime
+    import dates
+    return dates.format_datetime(value, format)
 
 # ----------------------------------------------------------------------------#
 # Controllers.
 # ----------------------------------------------------------------------------#
 
 
-@app.route('/')
+@main.route('/')
 def index():
     return render_template('pages/home.html')
 
 
+def conditional_render(validators, render):
+    # validators is a row of updated_at maxima and row counts from one cheap
+    # aggregate query. when the client's ETag / Last-Modified still match it
+    # gets a 304 without render() ever running
+    last_modified = validators_last_modified(validators)
+    if last_modified is None:
+        return render()
+    unchanged = not_modified(validators)
+    response = make_response('' if unchanged else render())
+    if unchanged:
+        response.status_code = 304
+    response.set_etag(validators_etag(validators), weak=True)
+    response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
+
+
+def not_modified(validators):
+    # whether the client's copy, going by its ETag or Last-Modified, is current
+    last_modified = validators_last_modified(validators)
+    if last_modified is None:
+        return False
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(validators_etag(validators))
+    return (request.if_modified_since is not None
+            and last_modified <= request.if_modified_since)
+
+
+def validators_last_modified(validators):
+    last_modified = max((v for v in validators if isinstance(v, datetime)), default=None)
+    if last_modified is None:
+        return None
+    return last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+
+
+def validators_etag(validators):
+    return hashlib.sha1(repr(tuple(validators)).encode()).hexdigest()
+
+
+def cached_detail(key, version, build):
+    # cached payloads carry the ETag of the validators they were built under:
+    # one built before another worker's edit, or before a show moved into the
+    # past, is a miss rather than served under the new ETag
+    entry = detail_cache.get(key)
+    if entry is None or entry.get('version') != version:
+        entry = {'version': version, 'data': build()}
+        detail_cache.set(key, entry)
+    return entry['data']
+
+
+def latest(*queries):
+    return db.session.execute(validators_statement(queries)).one()
+
+
+def validators_statement(queries):
+    # one SELECT of several scalar subqueries
+    return db.select(*[query.scalar_subquery() for query in queries])
+
+
 #  Venues
 #  ----------------------------------------------------------------
 
-@app.route('/venues')
+@main.route('/venues')
 def venues():
-    # split area and venue in the db to another table
-    areas = Area.query.all()
+    # ?genre=Jazz narrows the directory to venues tagged with that genre
+    genre = request.args.get('genre')
+    validators = latest(*venues_validators(genre))
+    return conditional_render(validators, lambda: render_venues(genre))
+
+
+# The *_validators() functions return the statements behind each read page's
+# validators; asgi.py runs the same ones on the async engine.
+
+def venues_validators(genre=None):
+    if not genre:
+        # the page is only as fresh as the directory it is read from
+        return directory.validators()
+    return (db.select(db.func.max(Area.updated_at)),
+            db.select(db.func.max(Venue.updated_at)),
+            db.select(db.func.count(Area.id)),
+            db.select(db.func.count(Venue.id)))
+
+
+def venues_statement(genre=None):
+    if not genre:
+        # precomputed, see directory.py
+        return directory.statement()
+    # one query: area -> venue with its maintained upcoming show counter
+    statement = db.select(
+        Area.id, Area.city, Area.state,
+        Venue.id.label('venue_id'), Venue.name, Venue.num_upcoming_shows
+    ).outerjoin(
+        Venue, Venue.area_id == Area.id
+    ).order_by(Area.id, Venue.id)
+    # areas without a matching venue drop out too
+    return statement.where(Venue.id.in_(genres.owners(Venue, genre)))
+
+
+def render_venues(genre=None):
+    rows = db.session.execute(venues_statement(genre)).all()
+    return render_template('pages/venues.html', areas=group_venues(rows))
+
+
+def group_venues(rows):
+    # rows are copied into plain dicts so no ORM objects are involved
     data = []
-    for area in areas:
-        area.venues = Venue.query.filter_by(
-            area_id=area.id).order_by('id').all()
-        for venue in area.venues:
-          venue.num_upcoming_shows = Show.query.filter_by(
-            venue_id=venue.id).order_by('id').count()
-          
-        data.append(area)
-    print("done!")
-    # join with areas table
-    return render_template('pages/venues.html', areas=data)
-
-
-@app.route('/venues/search', methods=['POST'])
+    areas = {}
+    for area_id, city, state, venue_id, venue_name, num_upcoming_shows in rows:
+        area = areas.get(area_id)
+        if area is None:
+            area = areas[area_id] = {
+                "city": city,
+                "state": state,
+                "venues": []
+            }
+            data.append(area)
+        if venue_id is not None:
+            area["venues"].append({
+                "id": venue_id,
+                "name": venue_name,
+                "num_upcoming_shows": num_upcoming_shows
+            })
+    return data
+
+
+@main.route('/venues/search', methods=['POST'])
 def search_venues():
-  search = request.form.get('search_term', '')
-  query = db.session.query(Venue).filter(Venue.name.ilike('%' + search + '%')).all()
+  search_term = request.form.get('search_term', '')
+  query = search.search(Venue, search_term).all()
   count  = len(query)
   data = []
 
@@ -87,7 +247,7 @@ def search_venues():
     data.append({
       "id": row.id,
       "name": row.name,
-      "num_upcoming_shows":1
+      "num_upcoming_shows": row.num_upcoming_shows
     })
 
   response={
@@ -97,43 +257,57 @@ def search_venues():
   return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
 
 
-@app.route('/venues/<int:venue_id>')
-def show_venue(venue_id):
-
-  result = db.session.query(Venue).filter_by(id=venue_id).first()
-  area = Area.query.filter_by(id=result.area_id).first()
-
-  past_shows_query = db.session.query(Show).join(Venue).filter(Show.venue_id==venue_id).filter(Show.start_time<datetime.now()).all()   
-  past_shows = []
-  for show in past_shows_query:
-      past_shows.append({
-                  "artist_id": show.artist_id,
-                  "artist_name": show.artist.name,
-                  "artist_image_link": show.artist.image_link,
-                  "start_time": show.start_time.strftime('%Y-%m-%d %H:%M:%S')
-                })
-  upcoming_shows_query = db.session.query(Show).join(Venue).filter(Show.venue_id==venue_id).filter(Show.start_time<datetime.now()).all()   
-  upcoming_shows = []
-  for show in upcoming_shows_query:
-      upcoming_shows.append({
-                  "artist_id": show.artist_id,
-                  "artist_name": show.artist.name,
-                  "artist_image_link": show.artist.image_link,
-                  "start_time": show.start_time.strftime('%Y-%m-%d %H:%M:%S')
-              })
-
-  data = {
-    "id": result.id,
-    "name": result.name,
-    "genres": result.genres,
-    "address": result.address,
-    "city": area.city,
-    "state": area.state,
-    "phone": result.phone,
-    "website": result.website,
-    "facebook_link": result.facebook_link,
-    "seeking_talent": result.seeking_talent,
-    "seeking_description": result.seeking_description,
+# Detail pages. The statements and payload builders below are shared with
+# the async read path in asgi.py, which runs the entity, area, past and
+# upcoming statements concurrently; here the entity comes with its area in one
+# statement and every show in a second, split on a single "now" so a show
+# can't land in both lists.
+
+def venue_shows(venue_id):
+  return db.select(
+      Show.artist_id, Artist.name.label('artist_name'),
+      Artist.image_link.label('artist_image_link'), Show.start_time
+  ).join(Artist, Show.artist_id == Artist.id).where(
+      Show.venue_id == venue_id).order_by(Show.start_time)
+
+
+def venue_statements(venue_id, now):
+  # entity, area, past shows, upcoming shows
+  shows = venue_shows(venue_id)
+  return (
+      db.select(Venue.__table__).where(Venue.id == venue_id),
+      db.select(Area.city, Area.state).join(Venue, Venue.area_id == Area.id).where(Venue.id == venue_id),
+      shows.where(Show.start_time < now),
+      shows.where(Show.start_time >= now),
+  )
+
+
+def show_entries(rows, *columns):
+  # formatted here once, so cached payloads render without any date work
+  import dates
+  labels = dates.format_all([row.start_time for row in rows], 'full')
+  return [
+      dict({column: getattr(row, column) for column in columns},
+           start_time=row.start_time.isoformat(), start_time_label=label)
+      for row, label in zip(rows, labels)
+  ]
+
+
+def venue_payload(venue, area, past_shows, upcoming_shows):
+  past_shows = show_entries(past_shows, "artist_id", "artist_name", "artist_image_link")
+  upcoming_shows = show_entries(upcoming_shows, "artist_id", "artist_name", "artist_image_link")
+  return {
+    "id": venue.id,
+    "name": venue.name,
+    "genres": genres.parse(venue.genres),
+    "address": venue.address,
+    "city": area.city if area is not None else None,
+    "state": area.state if area is not None else None,
+    "phone": venue.phone,
+    "website": venue.website,
+    "facebook_link": venue.facebook_link,
+    "seeking_talent": venue.seeking_talent,
+    "seeking_description": venue.seeking_description,
     "image_link": "https://images.unsplash.com/photo-1543900694-133f37abaaa5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=400&q=60",
     "past_shows": past_shows,
     "upcoming_shows": upcoming_shows,
@@ -141,47 +315,182 @@ def show_venue(venue_id):
     "upcoming_shows_count": len(upcoming_shows),
   }
 
+
+def split_shows(rows, now):
+  # rows are ordered by start_time, so the past shows are a prefix
+  past = [row for row in rows if row.start_time < now]
+  return past, rows[len(past):]
+
+
+def venue_detail(venue_id):
+  now = datetime.now()
+  # the row carries city/state too, so it stands in for the area
+  venue = db.session.execute(
+      db.select(Venue.__table__, Area.city, Area.state).outerjoin(
+          Area, Venue.area_id == Area.id).where(Venue.id == venue_id)).first()
+  if venue is None:
+    abort(404)
+  shows = db.session.execute(venue_shows(venue_id)).all()
+  return venue_payload(venue, venue, *split_shows(shows, now))
+
+
+def venue_cache_keys(venue_id):
+  # the venue's page and every artist page that lists one of its shows
+  artist_ids = db.session.query(Show.artist_id).filter_by(venue_id=venue_id).distinct()
+  return ['venue:%s' % venue_id] + ['artist:%s' % artist_id for artist_id, in artist_ids]
+
+
+@main.route('/venues/<int:venue_id>')
+def show_venue(venue_id):
+  validators = latest(*venue_validators(venue_id, datetime.now()))
+  version = validators_etag(validators)
+  return conditional_render(validators, lambda: render_venue(venue_id, version))
+
+
+def venue_validators(venue_id, now):
+  # the past/upcoming split moves with the clock, so the number of past
+  # shows is part of the validators too
+  shows = Show.venue_id == venue_id
+  return (
+      db.select(Venue.updated_at).where(Venue.id == venue_id),
+      db.select(Area.updated_at).join(Venue, Venue.area_id == Area.id).where(Venue.id == venue_id),
+      db.select(db.func.max(Show.updated_at)).where(shows),
+      db.select(db.func.max(Artist.updated_at)).join(Show, Show.artist_id == Artist.id).where(shows),
+      db.select(db.func.count(Show.id)).where(shows),
+      db.select(db.func.count(Show.id)).where(shows, Show.start_time < now))
+
+
+def render_venue(venue_id, version=None):
+  data = cached_detail('venue:%s' % venue_id, version, lambda: venue_detail(venue_id))
   return render_template('pages/show_venue.html', venue=data)
 
 #  Create Venue
 #  ----------------------------------------------------------------
 
 
-@app.route('/venues/create', methods=['GET'])
+#  Batch create
+#  ----------------------------------------------------------------
+#  POSTing a JSON array to /venues/create or /artists/create validates every
+#  item against the matching form, inserts the valid ones with a single flush
+#  and commits once. The response lists a result per item, in order.
+
+def batch_form_data(item):
+    # JSON item -> form data, as if the fields had been submitted by the form
+    data = MultiDict()
+    for key, value in item.items():
+        if key == 'genres' and isinstance(value, str):
+            value = [genre.strip() for genre in value.split(',') if genre.strip()]
+        if key == 'website':
+            key = 'website_link'
+        if isinstance(value, bool):
+            value = 'y' if value else ''
+        if isinstance(value, list):
+            for entry in value:
+                data.add(key, entry)
+        elif value is not None:
+            data.add(key, str(value))
+    return data
+
+
+def venue_from_item(form, area_ids):
+    return Venue(
+        name=form.name.data,
+        address=form.address.data,
+        phone=form.phone.data,
+        image_link=form.image_link.data,
+        facebook_link=form.facebook_link.data,
+        website=form.website_link.data,
+        area_id=area_ids[(form.city.data, form.state.data)],
+        genres=','.join(form.genres.data),
+        seeking_talent=form.seeking_talent.data,
+        seeking_description=form.seeking_description.data
+    )
+
+
+def artist_from_item(form, area_ids):
+    return Artist(
+        name=form.name.data,
+        phone=form.phone.data,
+        image_link=form.image_link.data,
+        facebook_link=form.facebook_link.data,
+        area_id=area_ids[(form.city.data, form.state.data)],
+        genres=','.join(form.genres.data)
+    )
+
+
+def create_batch(form_class, items, build):
+    results = []
+    created = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results.append({"index": index, "success": False, "errors": {"item": ["must be an object"]}})
+            continue
+        form = form_class(formdata=batch_form_data(item), meta={'csrf': False})
+        if not form.validate():
+            results.append({"index": index, "success": False, "errors": form.errors})
+            continue
+        result = {"index": index, "success": True}
+        results.append(result)
+        created.append((result, form))
+
+    try:
+        # every distinct area in one lookup (and one insert for new ones)
+        # instead of a round trip per item
+        area_ids = resolve_area_ids({(form.city.data, form.state.data) for _, form in created})
+        created = [(result, build(form, area_ids)) for result, form in created]
+        db.session.add_all([record for _, record in created])
+        db.session.flush()
+        for result, record in created:
+            result["id"] = record.id
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception('batch create failed')
+        abort(500)
+    finally:
+        db.session.close()
+
+    return jsonify({
+        "created": len(created),
+        "failed": len(results) - len(created),
+        "results": results
+    })
+
+
+@main.route('/venues/create', methods=['GET'])
 def create_venue_form():
+    from forms import VenueForm
     form = VenueForm()
     return render_template('forms/new_venue.html', form=form)
 
 
-@app.route('/venues/create', methods=['GET', 'POST'])
+@main.route('/venues/create', methods=['GET', 'POST'])
 def create_venue_submission():
+    from forms import VenueForm
+    payload = request.get_json()
+    if isinstance(payload, list):
+        return create_batch(VenueForm, payload, venue_from_item)
+
     error = False
     body = {}
     try:
-        name = request.get_json()['name']
-        city = request.get_json()['city']
-        state = request.get_json()['state']
-        address = request.get_json()['address']
-        phone = request.get_json()['phone']
-        image_link = request.get_json()['image_link']
-        facebook_link = request.get_json()['facebook_link']
-        genres = request.get_json()['genres']
-        seeking_talent = request.get_json()['seeking_talent']
-        seeking_description = request.get_json()['seeking_description']
+        name = payload['name']
+        city = payload['city']
+        state = payload['state']
+        address = payload['address']
+        phone = payload['phone']
+        image_link = payload['image_link']
+        facebook_link = payload['facebook_link']
+        genres = payload['genres']
+        seeking_talent = payload['seeking_talent']
+        seeking_description = payload['seeking_description']
 
         if seeking_talent == 'y':
             seeking_talent = True
         else:
             seeking_talent =False
-        #is the area already in the db, if not then make it.
-        area = Area.query.filter_by(city=city, state=state).first()
-        if area is None:
-          area = Area(
-            city=city,
-            state=state
-          )
-          db.session.add(area)
-          db.session.commit()
+        #is the area already in the db, if not then make it (same transaction).
+        area_id = resolve_area_id(city, state)
 
         venue = Venue(
           name=name,
@@ -189,7 +498,7 @@ def create_venue_submission():
           phone=phone,
           image_link=image_link,
           facebook_link=facebook_link,
-          area_id=area.id,
+          area_id=area_id,
           genres=genres,
           seeking_talent=seeking_talent,
           seeking_description=seeking_description
@@ -197,10 +506,11 @@ def create_venue_submission():
 
         db.session.add(venue)
         db.session.commit()
+        detail_cache.delete('venue:%s' % venue.id)
 
         body['name'] = venue.name
-        body['city'] = area.city
-        body['state'] = area.state
+        body['city'] = city
+        body['state'] = state
         body['address'] = venue.address
         body['phone'] = venue.phone
         body['image_link'] = venue.image_link
@@ -222,14 +532,19 @@ def create_venue_submission():
         #return render_template('pages/home.html')
         return jsonify(body)
 
-@app.route('/venues/<venue_id>', methods=['DELETE'])
+@main.route('/venues/<venue_id>', methods=['DELETE'])
 def delete_venue(venue_id):
     # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
     # clicking that button delete it from the db then redirect the user to the homepage
     error = False
     try:
+        cache_keys = venue_cache_keys(venue_id)
+        counters.delete_shows(Show.venue_id == venue_id)
+        # a bulk delete skips the session hooks that keep the genre index
+        genres.unlink(db.session.connection(), Venue, [venue_id])
         Venue.query.filter_by(id=venue_id).delete()
         db.session.commit()
+        detail_cache.delete(*cache_keys)
     except:
         db.session.rollback()
     finally:
@@ -242,16 +557,34 @@ def delete_venue(venue_id):
 #  ----------------------------------------------------------------
 
 
-@app.route('/artists')
+@main.route('/artists')
 def artists():
-    data = Artist.query.all()
+    genre = request.args.get('genre')
+    validators = latest(*artists_validators())
+    return conditional_render(validators, lambda: render_artists(genre))
+
+
+def artists_validators():
+    return (db.select(db.func.max(Artist.updated_at)),
+            db.select(db.func.count(Artist.id)))
+
+
+def artists_statement(genre=None):
+    statement = db.select(Artist.id, Artist.name).order_by(Artist.id)
+    if genre:
+        statement = statement.where(Artist.id.in_(genres.owners(Artist, genre)))
+    return statement
+
+
+def render_artists(genre=None):
+    data = db.session.execute(artists_statement(genre)).all()
     return render_template('pages/artists.html', artists=data)
 
 
-@app.route('/artists/search', methods=['POST'])
+@main.route('/artists/search', methods=['POST'])
 def search_artists():
-  search = request.form.get('search_term', '')
-  query = db.session.query(Artist).filter(Artist.name.ilike('%' + search + '%')).all()
+  search_term = request.form.get('search_term', '')
+  query = search.search(Artist, search_term).all()
   count  = len(query)
   data = []
 
@@ -259,10 +592,10 @@ def search_artists():
     data.append({
       "id": row.id,
       "name": row.name,
-      "num_upcoming_shows":1
+      "num_upcoming_shows": row.num_upcoming_shows
     })
 
-    response={
+  response={
     "count": count,
     "data": data
   }
@@ -270,39 +603,36 @@ def search_artists():
   return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
 
 
-@app.route('/artists/<int:artist_id>')
-def show_artist(artist_id):
-    
-    result = db.session.query(Artist).filter_by(id=artist_id).first()
-    area = Area.query.filter_by(id=result.area_id).first()
-
-    past_shows_query = db.session.query(Show).join(Artist).filter(Show.artist_id==artist_id).filter(Show.start_time<datetime.now()).all()   
-    past_shows = []
-    for show in past_shows_query:
-        past_shows.append({
-                    "venue_id": show.venue_id,
-                    "venue_name": show.venue.name,
-                    "artist_image_link": show.venue.image_link,
-                    "start_time": show.start_time.strftime('%Y-%m-%d %H:%M:%S')
-                    })
-    upcoming_shows_query = db.session.query(Show).join(Artist).filter(Show.artist_id==artist_id).filter(Show. start_time>datetime.now()).all()   
-    upcoming_shows = []
-    for show in upcoming_shows_query:
-        upcoming_shows.append({
-                    "venue_id": show.venue_id,
-                    "venue_name": show.venue.name,
-                    "artist_image_link": show.venue.image_link,
-                    "start_time": show.start_time.strftime('%Y-%m-%d %H:%M:%S')
-                })
-
-    data = {
-        "id": result.id,
-        "name": result.name,
-        "genres": result.genres,
-        "city": area.city,
-        "state": area.state,
-        "phone": result.phone,
-        "facebook_link": result.facebook_link,
+def artist_shows(artist_id):
+    return db.select(
+        Show.venue_id, Venue.name.label('venue_name'),
+        Venue.image_link.label('artist_image_link'), Show.start_time
+    ).join(Venue, Show.venue_id == Venue.id).where(
+        Show.artist_id == artist_id).order_by(Show.start_time)
+
+
+def artist_statements(artist_id, now):
+    # entity, area, past shows, upcoming shows
+    shows = artist_shows(artist_id)
+    return (
+        db.select(Artist.__table__).where(Artist.id == artist_id),
+        db.select(Area.city, Area.state).join(Artist, Artist.area_id == Area.id).where(Artist.id == artist_id),
+        shows.where(Show.start_time < now),
+        shows.where(Show.start_time >= now),
+    )
+
+
+def artist_payload(artist, area, past_shows, upcoming_shows):
+    past_shows = show_entries(past_shows, "venue_id", "venue_name", "artist_image_link")
+    upcoming_shows = show_entries(upcoming_shows, "venue_id", "venue_name", "artist_image_link")
+    return {
+        "id": artist.id,
+        "name": artist.name,
+        "genres": genres.parse(artist.genres),
+        "city": area.city if area is not None else None,
+        "state": area.state if area is not None else None,
+        "phone": artist.phone,
+        "facebook_link": artist.facebook_link,
         "image_link": "https://images.unsplash.com/photo-1543900694-133f37abaaa5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=400&q=60",
         "past_shows": past_shows,
         "upcoming_shows": upcoming_shows,
@@ -310,14 +640,48 @@ def show_artist(artist_id):
         "upcoming_shows_count": len(upcoming_shows),
     }
 
+
+def artist_detail(artist_id):
+    now = datetime.now()
+    artist = db.session.execute(
+        db.select(Artist.__table__, Area.city, Area.state).outerjoin(
+            Area, Artist.area_id == Area.id).where(Artist.id == artist_id)).first()
+    if artist is None:
+        abort(404)
+    shows = db.session.execute(artist_shows(artist_id)).all()
+    return artist_payload(artist, artist, *split_shows(shows, now))
+
+
+@main.route('/artists/<int:artist_id>')
+def show_artist(artist_id):
+    validators = latest(*artist_validators(artist_id, datetime.now()))
+    version = validators_etag(validators)
+    return conditional_render(validators, lambda: render_artist(artist_id, version))
+
+
+def artist_validators(artist_id, now):
+    # see venue_validators()
+    shows = Show.artist_id == artist_id
+    return (
+        db.select(Artist.updated_at).where(Artist.id == artist_id),
+        db.select(Area.updated_at).join(Artist, Artist.area_id == Area.id).where(Artist.id == artist_id),
+        db.select(db.func.max(Show.updated_at)).where(shows),
+        db.select(db.func.max(Venue.updated_at)).join(Show, Show.venue_id == Venue.id).where(shows),
+        db.select(db.func.count(Show.id)).where(shows),
+        db.select(db.func.count(Show.id)).where(shows, Show.start_time < now))
+
+
+def render_artist(artist_id, version=None):
+    data = cached_detail('artist:%s' % artist_id, version, lambda: artist_detail(artist_id))
     return render_template('pages/show_artist.html', artist=data)
 
 #  Update
 #  ----------------------------------------------------------------
 
 
-@app.route('/artists/<int:artist_id>/edit', methods=['GET'])
+@main.route('/artists/<int:artist_id>/edit', methods=['GET'])
 def edit_artist(artist_id):
+    from forms import ArtistForm
     form = ArtistForm()
     artist = {
         "id": 4,
@@ -336,16 +700,17 @@ def edit_artist(artist_id):
     return render_template('forms/edit_artist.html', form=form, artist=artist)
 
 
-@app.route('/artists/<int:artist_id>/edit', methods=['POST'])
+@main.route('/artists/<int:artist_id>/edit', methods=['POST'])
 def edit_artist_submission(artist_id):
     # TODO: take values from the form submitted, and update existing
     # artist record with ID <artist_id> using the new attributes
 
-    return redirect(url_for('show_artist', artist_id=artist_id))
+    return redirect(url_for('main.show_artist', artist_id=artist_id))
 
 
-@app.route('/venues/<int:venue_id>/edit', methods=['GET'])
+@main.route('/venues/<int:venue_id>/edit', methods=['GET'])
 def edit_venue(venue_id):
+    from forms import VenueForm
     form = VenueForm()
     
     error = False
@@ -373,7 +738,7 @@ def edit_venue(venue_id):
         return render_template('forms/edit_venue.html', form=form, venue=venue, area=area, body=body)
 
 
-@app.route('/venues/<int:venue_id>/edit', methods=['POST'])
+@main.route('/venues/<int:venue_id>/edit', methods=['POST'])
 def edit_venue_submission(venue_id):
     name = request.get_json()['name']
     genres = request.get_json()['genres']
@@ -395,20 +760,10 @@ def edit_venue_submission(venue_id):
     error= False
     try:
         venue = Venue.query.get(venue_id)
-        area = Area.query.get(venue.area_id)
-
-        area = Area.query.filter_by(city=city, state=state).first()
-        if area is None:
-          area = Area(
-            city=city,
-            state=state
-          )
-          db.session.add(area)
-          db.session.commit()
 
         venue.name = name
         venue.genres = genres
-        venue.area_id = area.id
+        venue.area_id = resolve_area_id(city, state)
         venue.address = address
         venue.phone = phone
         venue.website = website
@@ -419,6 +774,7 @@ def edit_venue_submission(venue_id):
           
         db.session.add(venue)
         db.session.commit()
+        detail_cache.delete(*venue_cache_keys(venue_id))
     except:
         db.session.rollback()
     finally:
@@ -427,41 +783,39 @@ def edit_venue_submission(venue_id):
         abort(500)
     return '', 200
 
-    return redirect(url_for('show_venue', venue_id=venue_id))
+    return redirect(url_for('main.show_venue', venue_id=venue_id))
 
 #  Create Artist
 #  ----------------------------------------------------------------
 
 
-@app.route('/artists/create', methods=['GET'])
+@main.route('/artists/create', methods=['GET'])
 def create_artist_form():
+    from forms import ArtistForm
     form = ArtistForm()
     return render_template('forms/new_artist.html', form=form)
 
 
-@app.route('/artists/create', methods=['POST'])
+@main.route('/artists/create', methods=['POST'])
 def create_artist_submission():
+    from forms import ArtistForm
+    payload = request.get_json()
+    if isinstance(payload, list):
+        return create_batch(ArtistForm, payload, artist_from_item)
 
     error = False
     body = {}
     try:
-        name = request.get_json()['name']
-        city = request.get_json()['city']
-        state = request.get_json()['state']
-        genres = request.get_json()['genres']
-        phone = request.get_json()['phone']
-        image_link = request.get_json()['image_link']
-        facebook_link = request.get_json()['facebook_link']
-
-        #is the area already in the db, if not then make it.
-        area = Area.query.filter_by(city=city, state=state).first()
-        if area is None:
-          area = Area(
-            city=city,
-            state=state
-          )
-          db.session.add(area)
-          db.session.commit()
+        name = payload['name']
+        city = payload['city']
+        state = payload['state']
+        genres = payload['genres']
+        phone = payload['phone']
+        image_link = payload['image_link']
+        facebook_link = payload['facebook_link']
+
+        #is the area already in the db, if not then make it (same transaction).
+        area_id = resolve_area_id(city, state)
 
         artist = Artist(
           name=name,
@@ -469,15 +823,15 @@ def create_artist_submission():
           phone=phone,
           image_link=image_link,
           facebook_link=facebook_link,
-          area_id=area.id
+          area_id=area_id
         )
 
         db.session.add(artist)
         db.session.commit()
         
         body['name'] = artist.name
-        body['city'] = area.city
-        body['state'] = area.state
+        body['city'] = city
+        body['state'] = state
         body['phone'] = artist.phone
         body['image_link'] = artist.image_link
         body['facebook_link'] = artist.facebook_link
@@ -503,56 +857,87 @@ def create_artist_submission():
 #  Shows
 #  ----------------------------------------------------------------
 
-@app.route('/shows')
+@main.route('/shows')
 def shows():
-  result = db.session.query(Show).all()
-  data = []
-
-  for row in result:
-    data.append({
-      "venue_id": row.venue_id,
-      "venue_name": row.venue.name,
-      "artist_id": row.artist_id,
-      "artist_name": row.artist.name,
-      "artist_image_link": "https://images.unsplash.com/photo-1549213783-8284d0336c4f?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=300&q=80",
-      "start_time": row.start_time.strftime("%m/%d/%Y, %H:%M:%S")
-    })
-    return render_template('pages/shows.html', shows=data)
-
-
-@app.route('/shows/create')
+  # names come from the same query and rows are read from a server-side
+  # cursor in batches, so the page streams out while the query is still
+  # being consumed and memory stays flat however many shows exist
+  result = db.session.query(
+      Show.venue_id, Venue.name, Show.artist_id, Artist.name, Show.start_time
+  ).join(Venue, Show.venue_id == Venue.id).join(
+      Artist, Show.artist_id == Artist.id
+  ).order_by(Show.start_time).execution_options(
+      stream_results=True).yield_per(current_app.config['SHOWS_STREAM_BATCH_SIZE'])
+
+  def generate():
+    for venue_id, venue_name, artist_id, artist_name, start_time in result:
+      yield {
+        "venue_id": venue_id,
+        "venue_name": venue_name,
+        "artist_id": artist_id,
+        "artist_name": artist_name,
+        "artist_image_link": "https://images.unsplash.com/photo-1549213783-8284d0336c4f?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=300&q=80",
+        "start_time": start_time
+      }
+
+  return Response(stream_template('pages/shows.html', shows=generate()))
+
+
+@main.route('/shows/create')
 def create_shows():
     # renders form. do not touch.
+    from forms import ShowForm
     form = ShowForm()
     return render_template('forms/new_show.html', form=form)
 
 
-@app.route('/shows/create', methods=['POST'])
+@main.route('/shows/create', methods=['POST'])
 def create_show_submission():
+  from forms import ShowForm
+  form = ShowForm(request.form, meta={'csrf': False})
+  # start_time is still parsed leniently below, so only the duration goes
+  # through the form's validators
+  if not form.duration.validate(form):
+    flash('Duration: ' + ' '.join(form.duration.errors))
+    return render_template('forms/new_show.html', form=form), 400
+
   error = False
   error_message = ""
+  conflict = None
   try:
     artist_id = request.form.get("artist_id", False)
     venue_id = request.form.get("venue_id", False)
     start_time = request.form.get("start_time", False)
 
-    show = Show(artist_id=artist_id, venue_id=venue_id, start_time=start_time)
+    import dateutil.parser
+    start_time = dateutil.parser.parse(start_time)
+    end_time = start_time + timedelta(minutes=form.duration.data)
+    show = Show(artist_id=artist_id, venue_id=venue_id, start_time=start_time, end_time=end_time)
 
-    # time_exists = db.session.query(Show.id).filter_by(start_time=show.start_time).first() is not None
-    artist_exists = db.session.query(Artist.id).filter_by(id=show.artist_id).first() is not None
-    venue_exists = db.session.query(Venue.id).filter_by(id=show.venue_id).first() is not None
+    # existence and double-booking in one query
+    artist_exists, venue_exists, venue_booked, artist_booked = bookings.check(
+      venue_id, artist_id, start_time, end_time)
 
     if not artist_exists:
       error_message = "Artist ID doesn't exist"
     if not venue_exists:
       error_message = "Venue ID doesn't exist"
 
-    if artist_exists and venue_exists:
-      db.session.add(show)
-      db.session.commit()  
-    else:
+    if not (artist_exists and venue_exists):
       error = True
-  
+    elif venue_booked or artist_booked:
+      conflict = 'venue' if venue_booked else 'artist'
+    else:
+      db.session.add(show)
+      counters.show_added(show)
+      db.session.commit()
+      detail_cache.delete('venue:%s' % venue_id, 'artist:%s' % artist_id)
+
+  except IntegrityError as e:
+    # a concurrent booking got in first (Postgres exclusion constraints)
+    db.session.rollback()
+    conflict = bookings.violated(e)
+    error = conflict is None
   except:
     db.session.rollback()
     error = True
@@ -560,6 +945,9 @@ def create_show_submission():
     print(sys.exc_info())
   finally:
     db.session.close()
+  if conflict:
+    flash('The %s is already booked for a show at that time.' % conflict)
+    return render_template('forms/new_show.html', form=form), 409
   if error:
     flash(error_message)
     abort(500)
@@ -569,44 +957,226 @@ def create_show_submission():
     return render_template('pages/home.html')
 
 
-@app.errorhandler(404)
+#  Export
+#  ----------------------------------------------------------------
+
+@main.route('/export/<any(venues, artists, shows):kind>')
+def export(kind):
+    # /export/shows?format=jsonl&gzip=1
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'jsonl'):
+        abort(400)
+    gzip = request.args.get('gzip', '0') in ('1', 'true', 'yes')
+    filename = f'{kind}.{fmt}' + ('.gz' if gzip else '')
+    if gzip:
+        mimetype = 'application/gzip'
+    elif fmt == 'csv':
+        mimetype = 'text/csv'
+    else:
+        mimetype = 'application/x-ndjson'
+    return Response(
+        stream_with_context(exporter.export_chunks(kind, fmt, gzip)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+
+#  Internal
+#  ----------------------------------------------------------------
+
+@main.route('/internal/cache')
+def cache_stats():
+    return jsonify(detail_cache.stats())
+
+
+@main.route('/internal/pool')
+def pool_stats():
+    return jsonify(pool.pool_stats(db.engine))
+
+
+#  Maintenance commands
+#  ----------------------------------------------------------------
+
+@main.cli.command('rollover-shows')
+def rollover_shows_command():
+    # meant to run from cron every few minutes
+    moved = counters.rollover_shows()
+    if moved:
+        directory.refresh()
+        db.session.commit()
+    print(f'{moved} shows moved from upcoming to past')
+
+
+@main.cli.command('import')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']),
+              help='Defaults to the file extension.')
+@click.option('--batch-size', default=5000, show_default=True)
+def import_command(kind, path, fmt, batch_size):
+    # flask import venues venues.csv / flask import shows shows.jsonl
+    import importer
+    fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.json')) else 'csv')
+    importer.import_rows(kind, importer.read_rows(path, fmt), batch_size=batch_size)
+
+
+@main.cli.command('export')
+@click.argument('kind', type=click.Choice(exporter.KINDS))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default='csv', show_default=True)
+@click.option('--gzip', is_flag=True)
+@click.option('--output', '-o', type=click.File('wb'), default='-', help='Defaults to stdout.')
+def export_command(kind, fmt, gzip, output):
+    # flask export shows --format jsonl --gzip -o shows.jsonl.gz
+    for chunk in exporter.export_chunks(kind, fmt, gzip):
+        output.write(chunk)
+
+
+@main.cli.command('seed')
+@click.option('--shows', default=10000, show_default=True,
+              help='Venues, artists and areas are sized from this.')
+@click.option('--seed', 'random_seed', default=42, show_default=True)
+def seed_command(shows, random_seed):
+    # flask seed --shows 1000000 (into DATABASE_URL, SQLite or Postgres)
+    import seed
+    seed.seed(shows, random_seed)
+
+
+@main.cli.command('benchmark')
+@click.option('--iterations', default=20, show_default=True)
+@click.option('--output', type=click.Path(dir_okay=False), help='Write results as a JSON baseline.')
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False),
+              help='Compare against an earlier run and fail on regressions.')
+@click.option('--tolerance', default=0.2, show_default=True, help='Allowed p50 growth.')
+def benchmark_command(iterations, output, baseline, tolerance):
+    import benchmark
+    results = benchmark.run(current_app._get_current_object(), detail_cache, iterations)
+    if output:
+        benchmark.save(output, results)
+    if baseline:
+        found = benchmark.regressions(results, benchmark.load(baseline), tolerance)
+        for regression in found:
+            print('REGRESSION ' + regression)
+        if found:
+            sys.exit(1)
+
+
+@main.cli.command('replay')
+@click.argument('log', type=click.Path(exists=True, dir_okay=False))
+@click.option('--url', help='Server to replay against; defaults to this app on a local werkzeug server.')
+@click.option('--concurrency', default=8, show_default=True)
+@click.option('--speed', default=1.0, show_default=True,
+              help='Speed-up over the recorded timing; 0 sends as fast as possible.')
+@click.option('--output', type=click.Path(dir_okay=False), help='Also write the report as JSON.')
+def replay_command(log, url, concurrency, speed, output):
+    # record with REPLAY_LOG_PATH=access.jsonl, then: flask replay access.jsonl --speed 4
+    server = None
+    if not url:
+        url, server = loadtest.serve(current_app._get_current_object())
+    try:
+        report = loadtest.replay(loadtest.read_log(log), url, concurrency, speed)
+    finally:
+        if server is not None:
+            server.shutdown()
+    print(f'{report["requests"]} requests in {report["elapsed_s"]}s '
+          f'({report["throughput_rps"]} req/s), {report["errors"]} errors')
+    for route, stats in report["routes"].items():
+        print(f'{route:28} n={stats["requests"]:<6} p50 {stats["p50_ms"]:8.2f}ms  '
+              f'p95 {stats["p95_ms"]:8.2f}ms  p99 {stats["p99_ms"]:8.2f}ms  '
+              f'errors {stats["error_rate"]:.2%}')
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+@main.cli.command('compile-templates')
+def compile_templates_command():
+    # run at build time with TEMPLATE_CACHE_DIR pointing at the shipped cache
+    if not current_app.config.get('TEMPLATE_CACHE_DIR'):
+        raise click.UsageError('TEMPLATE_CACHE_DIR is not set')
+    if not templates_cache.writable(current_app):
+        raise click.UsageError(f'{current_app.config["TEMPLATE_CACHE_DIR"]} is not writable')
+    names = templates_cache.compile_templates(current_app)
+    print(f'compiled {len(names)} templates into {current_app.config["TEMPLATE_CACHE_DIR"]}')
+
+
+@main.cli.command('create-schema')
+def create_schema_command():
+    # for throwaway SQLite databases; anything long-lived uses `flask db upgrade`
+    db.create_all()
+    search.create_search_index(db.engine)
+    directory.create_directory(db.engine)
+    print('schema created')
+
+
+@main.cli.command('import-time')
+@click.option('--budget', default=IMPORT_TIME_BUDGET_MS, show_default=True, help='Milliseconds allowed.')
+def import_time_command(budget):
+    # CI guard, also run by tests/test_import_time.py
+    elapsed, eager = measure_import()
+    print(f'import app: {elapsed:.0f}ms (budget {budget}ms)')
+    if eager:
+        print('imported eagerly: ' + ', '.join(eager))
+    if elapsed > budget or eager:
+        sys.exit(1)
+
+
+def measure_import():
+    # importing the app module in a fresh interpreter must stay cheap and must
+    # not pull in anything create_app() and the views load lazily; returns
+    # (milliseconds, DEFERRED_IMPORTS that were loaded anyway)
+    import subprocess
+    import time
+    started = time.perf_counter()
+    loaded = subprocess.run(
+        [sys.executable, '-c', 'import sys, app; print("\\n".join(sys.modules))'],
+        check=True, capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))).stdout.split()
+    elapsed = (time.perf_counter() - started) * 1000
+    return elapsed, sorted(name for name in DEFERRED_IMPORTS if name in loaded)
+
+
+@main.cli.command('recount-upcoming-shows')
+def recount_upcoming_shows_command():
+    counters.recount_upcoming_shows()
+    directory.refresh()
+    db.session.commit()
+    print('upcoming show counters rebuilt')
+
+
+@main.cli.command('refresh-directory')
+def refresh_directory_command():
+    # cron backstop for the refresh scheduled after writes
+    directory.refresh()
+    db.session.commit()
+    print('area directory refreshed')
+
+
+@main.app_errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
 
 
-@app.errorhandler(400)
+@main.app_errorhandler(400)
 def server_error(error):
     return render_template('errors/400.html'), 400
 
 
-@app.errorhandler(405)
+@main.app_errorhandler(405)
 def server_error(error):
     return render_template('errors/405.html'), 405
 
 
-@app.errorhandler(500)
+@main.app_errorhandler(500)
 def server_error(error):
     return render_template('errors/500.html'), 500
 
 
-if not app.debug:
-    file_handler = FileHandler('error.log')
-    file_handler.setFormatter(
-        Formatter(
-            '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
-    )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.info('errors')
-
 # ----------------------------------------------------------------------------#
 # Launch.
 # ----------------------------------------------------------------------------#
 
 # Default port:
 if __name__ == '__main__':
-    app.app_context()
+    app = create_app()
     app.debug = True
     app.run(debug=True)
     app.run(host="0.0.0.0", port=3000)
@@ -615,5 +1185,5 @@ if __name__ == '__main__':
 '''
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port)
+    create_app().run(host='0.0.0.0', port=port)
 '''
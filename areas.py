@@ -0,0 +1,115 @@
+from datetime import datetime
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Area
+from cache import LRUCache
+
+# ----------------------------------------------------------------------------#
+# Area lookup.
+#
+# resolve_area_id() returns the id for (city, state), creating the area inside
+# the caller's transaction if needed; no separate commit. resolve_area_ids()
+# does the same for a whole batch of areas in a fixed number of statements.
+# Both read first, since nearly every lookup is for an area that exists, and
+# only insert what the read didn't find. Inserts rely on uq_area_city_state,
+# so two requests racing on a new city end up with one row.
+#
+# Ids are cached per process, but only ones read back from the database: an
+# id we just inserted could still be rolled back with the caller's
+# transaction.
+# ----------------------------------------------------------------------------#
+
+AREA_CACHE_SIZE = 4096
+
+area_ids = LRUCache(max_size=AREA_CACHE_SIZE, ttl=float('inf'))
+
+
+def _select_id(city, state):
+    return db.session.query(Area.id).filter_by(city=city, state=state).scalar()
+
+
+def _insert_id(city, state):
+    # id of a newly inserted area, or None if it already existed
+    values = {'city': city, 'state': state, 'updated_at': datetime.utcnow()}
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        return db.session.execute(
+            postgresql.insert(Area).values(**values)
+            .on_conflict_do_nothing(index_elements=['city', 'state'])
+            .returning(Area.id)
+        ).scalar()
+
+    if dialect == 'sqlite':
+        result = db.session.execute(
+            sqlite.insert(Area).values(**values).on_conflict_do_nothing())
+        return result.lastrowid if result.rowcount == 1 else None
+
+    try:
+        with db.session.begin_nested():
+            return db.session.execute(
+                db.insert(Area).values(**values)).inserted_primary_key[0]
+    except IntegrityError:
+        return None
+
+
+def _select_ids(keys):
+    rows = db.session.query(Area.city, Area.state, Area.id).filter(
+        db.tuple_(Area.city, Area.state).in_(keys))
+    return {(city, state): area_id for city, state, area_id in rows}
+
+
+def _insert_many(keys):
+    now = datetime.utcnow()
+    rows = [{'city': city, 'state': state, 'updated_at': now} for city, state in keys]
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        db.session.execute(postgresql.insert(Area).values(rows).on_conflict_do_nothing(
+            index_elements=['city', 'state']))
+    elif dialect == 'sqlite':
+        db.session.execute(sqlite.insert(Area).values(rows).on_conflict_do_nothing())
+    else:
+        for city, state in keys:
+            _insert_id(city, state)
+
+
+def resolve_area_ids(keys):
+    # {(city, state): id} for many areas at once: one SELECT for the ones not
+    # cached, then one multi-row insert and a read-back for any still missing
+    ids = {}
+    for key in keys:
+        area_id = area_ids.get(key)
+        if area_id is not None:
+            ids[key] = area_id
+    missing = [key for key in keys if key not in ids]
+    if missing:
+        existing = _select_ids(missing)
+        for key, area_id in existing.items():
+            area_ids.set(key, area_id)
+        ids.update(existing)
+        missing = [key for key in missing if key not in existing]
+    if missing:
+        _insert_many(missing)
+        ids.update(_select_ids(missing))
+    return ids
+
+
+def resolve_area_id(city, state):
+    key = (city, state)
+    area_id = area_ids.get(key)
+    if area_id is not None:
+        return area_id
+
+    area_id = _select_id(city, state)
+    if area_id is not None:
+        area_ids.set(key, area_id)
+        return area_id
+
+    area_id = _insert_id(city, state)
+    if area_id is None:
+        # another request created it since our read
+        area_id = _select_id(city, state)
+        area_ids.set(key, area_id)
+    return area_id
@@ -0,0 +1,309 @@
+import asyncio
+import concurrent.futures
+import io
+import re
+import sys
+import threading
+from datetime import datetime
+from urllib.parse import parse_qsl
+
+from flask import abort, render_template
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
+
+import app as views
+
+# ----------------------------------------------------------------------------#
+# ASGI entry point with an async read path.
+#
+#   uvicorn --factory asgi:create_asgi_app --workers 4
+#
+# The read pages (/venues, /artists and the venue and artist detail pages) are
+# served from SQLAlchemy's asyncio engine (asyncpg on Postgres, aiosqlite on
+# SQLite). Their independent statements (entity, area, past shows, upcoming
+# shows) run concurrently on separate connections, and the results go through
+# the same payload builders and templates as the Flask views. A worker waiting
+# on the database keeps serving other readers instead of blocking a thread.
+#
+# Every other request (forms, writes, streamed pages, exports, the JSON API)
+# is handed to the Flask app on a worker thread, so one server covers the
+# whole site. Read pages served here answer conditional requests with the same
+# validators, ETags and 304s as the Flask views, but skip the detail cache.
+# They run inside a Flask request context, so the request hooks, the error
+# handlers and the Server-Timing header behave as they do for the views.
+# ----------------------------------------------------------------------------#
+
+ASYNC_DRIVERS = {'postgresql': 'postgresql+asyncpg', 'sqlite': 'sqlite+aiosqlite'}
+
+
+def async_database_url(config):
+    url = make_url(config.get('ASYNC_DATABASE_URI') or config['SQLALCHEMY_DATABASE_URI'])
+    if url.drivername in ASYNC_DRIVERS.values():
+        return url
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+
+
+def create_engine(config):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = async_database_url(config)
+    options = {}
+    if url.get_backend_name() == 'postgresql':
+        if config.get('DB_POOL_MODE', 'session') == 'transaction':
+            # the bouncer can't keep asyncpg's per-connection prepared statements
+            options['poolclass'] = NullPool
+            options['connect_args'] = {'statement_cache_size': 0}
+            url = url.update_query_dict({'prepared_statement_cache_size': '0'})
+        else:
+            options.update(
+                pool_size=config.get('DB_POOL_SIZE', 10),
+                max_overflow=config.get('DB_MAX_OVERFLOW', 10),
+                pool_timeout=config.get('DB_POOL_TIMEOUT', 30),
+                pool_recycle=config.get('DB_POOL_RECYCLE', 1800),
+                pool_pre_ping=config.get('DB_POOL_PRE_PING', True))
+            timeout = config.get('DB_STATEMENT_TIMEOUT_MS')
+            if timeout:
+                options['connect_args'] = {'server_settings': {'statement_timeout': str(int(timeout))}}
+    return create_async_engine(url, **options)
+
+
+async def fetch_all(engine, statements):
+    # one connection per statement, so they run concurrently
+    async def fetch(statement):
+        async with engine.connect() as connection:
+            return (await connection.execute(statement)).all()
+    return await asyncio.gather(*(fetch(statement) for statement in statements))
+
+
+#  Read pages: each gets the query string arguments and the ids from the
+#  path, and returns (template, context), or None for a 404. Its validators
+#  (see ROUTES) are read first, so a 304 costs a single statement.
+#  ----------------------------------------------------------------
+
+async def venues(engine, args):
+    rows, = await fetch_all(engine, [views.venues_statement(args.get('genre'))])
+    return 'pages/venues.html', {"areas": views.group_venues(rows)}
+
+
+async def artists(engine, args):
+    rows, = await fetch_all(engine, [views.artists_statement(args.get('genre'))])
+    return 'pages/artists.html', {"artists": rows}
+
+
+async def show_venue(engine, args, venue_id):
+    venue, area, past, upcoming = await fetch_all(
+        engine, views.venue_statements(venue_id, datetime.now()))
+    if not venue:
+        return None
+    data = views.venue_payload(venue[0], area[0] if area else None, past, upcoming)
+    return 'pages/show_venue.html', {"venue": data}
+
+
+async def show_artist(engine, args, artist_id):
+    artist, area, past, upcoming = await fetch_all(
+        engine, views.artist_statements(artist_id, datetime.now()))
+    if not artist:
+        return None
+    data = views.artist_payload(artist[0], area[0] if area else None, past, upcoming)
+    return 'pages/show_artist.html', {"artist": data}
+
+
+# (path, page, validator statements for the same arguments)
+ROUTES = [
+    (re.compile(r'/venues/?'), venues,
+     lambda args: views.venues_validators(args.get('genre'))),
+    (re.compile(r'/artists/?'), artists,
+     lambda args: views.artists_validators()),
+    (re.compile(r'/venues/(\d+)'), show_venue,
+     lambda args, venue_id: views.venue_validators(venue_id, datetime.now())),
+    (re.compile(r'/artists/(\d+)'), show_artist,
+     lambda args, artist_id: views.artist_validators(artist_id, datetime.now())),
+]
+
+
+#  ASGI <-> WSGI
+#  ----------------------------------------------------------------
+
+def wsgi_environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin-1'),
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': client[0],
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = name if name == 'CONTENT_TYPE' else 'HTTP_' + name
+        environ[key] = environ[key] + ',' + value if key in environ else value
+    return environ
+
+
+def encode_headers(headers):
+    return [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+
+async def read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+async def call_wsgi(wsgi_app, scope, receive, send):
+    # runs the WSGI app on a worker thread; chunks come back through a small
+    # queue, so streamed responses stay streamed and a slow client holds the
+    # producer back
+    environ = wsgi_environ(scope, await read_body(receive))
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=8)
+    abandoned = threading.Event()
+
+    def put(item):
+        future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        while not abandoned.is_set():
+            try:
+                return future.result(timeout=1)
+            except concurrent.futures.TimeoutError:
+                pass
+        future.cancel()
+        raise ConnectionAbortedError('client went away')
+
+    def run():
+        try:
+            started = []
+
+            def start_response(status, headers, exc_info=None):
+                started[:] = [int(status.split(' ', 1)[0]), headers]
+
+            result = wsgi_app(environ, start_response)
+            try:
+                put(('start', started))
+                for chunk in result:
+                    if chunk:
+                        put(('body', chunk))
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+            put(('end', None))
+        except ConnectionAbortedError:
+            pass
+        except BaseException as error:
+            if not abandoned.is_set():
+                put(('error', error))
+
+    loop.run_in_executor(None, run)
+    try:
+        while True:
+            kind, value = await queue.get()
+            if kind == 'start':
+                status, headers = value
+                await send({'type': 'http.response.start', 'status': status,
+                            'headers': encode_headers(headers)})
+            elif kind == 'body':
+                await send({'type': 'http.response.body', 'body': value, 'more_body': True})
+            elif kind == 'end':
+                await send({'type': 'http.response.body', 'body': b''})
+                return
+            else:
+                raise value
+    finally:
+        abandoned.set()
+
+
+def render_page(page):
+    if page is None:
+        abort(404)
+    template, context = page
+    return render_template(template, **context)
+
+
+class ReadApp:
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.engine = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            return
+        if scope['method'] in ('GET', 'HEAD'):
+            for pattern, handler, validators in ROUTES:
+                match = pattern.fullmatch(scope['path'])
+                if match:
+                    args = [int(group) for group in match.groups()]
+                    return await self.read(scope, send, handler, validators, args)
+        await call_wsgi(self.flask_app, scope, receive, send)
+
+    async def read(self, scope, send, handler, validators, args):
+        if self.engine is None:
+            # created inside the running loop, which asyncpg connections are tied to
+            self.engine = create_engine(self.flask_app.config)
+        query = dict(parse_qsl(scope['query_string'].decode('latin-1')))
+
+        app = self.flask_app
+        # the request context lives in a context variable, so it stays this
+        # request's own while the statements are awaited, and the engine
+        # events in instrumentation.py count them. Errors go through the same
+        # steps as in Flask's full_dispatch_request() and wsgi_app()
+        with app.request_context(wsgi_environ(scope, b'')):
+            try:
+                try:
+                    response = app.preprocess_request()
+                    if response is None:
+                        response = await self.respond(handler, validators, query, args)
+                except Exception as error:
+                    response = app.handle_user_exception(error)
+                response = app.finalize_request(response)
+            except Exception as error:
+                response = app.handle_exception(error)
+            body = response.get_data()
+
+        await send({'type': 'http.response.start', 'status': response.status_code,
+                    'headers': encode_headers(response.headers.items())})
+        await send({'type': 'http.response.body',
+                    'body': b'' if scope['method'] == 'HEAD' else body})
+
+    async def respond(self, handler, validators, query, args):
+        # validators first: a client whose copy is current costs one statement
+        (validators,), = await fetch_all(
+            self.engine, [views.validators_statement(validators(query, *args))])
+        page = None
+        if not views.not_modified(validators):
+            page = await handler(self.engine, query, *args)
+        return views.conditional_render(validators, lambda: render_page(page))
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.engine is not None:
+                    await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def create_asgi_app(flask_app=None):
+    return ReadApp(flask_app or views.create_app())
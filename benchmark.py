@@ -0,0 +1,150 @@
+import json
+import time
+
+from sqlalchemy import event
+
+import areas
+from models import db, Area, Venue, Artist
+
+# ----------------------------------------------------------------------------#
+# Route benchmark.
+#
+# Times every page through the Flask test client against the configured
+# database (seed it first with `flask seed`), and records latency percentiles
+# and statements per request. Results can be written out as a JSON baseline and
+# later runs compared against it; a route regresses when its p50 grows by more
+# than the tolerance or it issues more statements than before.
+#
+# The detail cache is cleared before each detail request and no validators are
+# sent, so every hit measures the full database + render path. The create
+# routes commit real rows; each one is deleted again right after its request
+# (outside the timing), so the dataset is the same for every run.
+# ----------------------------------------------------------------------------#
+
+CREATE_VENUE = {
+    "name": "Benchmark Hall", "city": "Benchmark City", "state": "CA", "address": "1 Main St",
+    "phone": "", "image_link": "", "facebook_link": "", "genres": "Jazz",
+    "seeking_talent": "n", "seeking_description": "",
+}
+CREATE_ARTIST = {
+    "name": "Benchmark Band", "city": "Benchmark City", "state": "CA", "genres": "Jazz",
+    "phone": "", "image_link": "", "facebook_link": "",
+}
+
+# route name -> (model, payload) of the rows its requests create
+CREATES = {
+    "POST /venues/create": (Venue, CREATE_VENUE),
+    "POST /artists/create": (Artist, CREATE_ARTIST),
+}
+
+
+def routes(venue_id, artist_id, search_term):
+    # name -> (method, path, request kwargs)
+    return {
+        "GET /venues": ('get', '/venues', {}),
+        "GET /venues/<id>": ('get', f'/venues/{venue_id}', {}),
+        "GET /artists": ('get', '/artists', {}),
+        "GET /artists/<id>": ('get', f'/artists/{artist_id}', {}),
+        "GET /shows": ('get', '/shows', {}),
+        "POST /venues/search": ('post', '/venues/search', {"data": {"search_term": search_term}}),
+        "POST /artists/search": ('post', '/artists/search', {"data": {"search_term": search_term}}),
+        "POST /venues/create": ('post', '/venues/create', {"json": CREATE_VENUE}),
+        "POST /artists/create": ('post', '/artists/create', {"json": CREATE_ARTIST}),
+    }
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def delete_created(app, model, payload, after_id):
+    # ORM deletes, so the genre links and the search index follow
+    with app.app_context():
+        for row in model.query.filter(model.id > after_id, model.name == payload['name']).all():
+            db.session.delete(row)
+        db.session.commit()
+
+
+def delete_area(app, city, state):
+    with app.app_context():
+        Area.query.filter_by(city=city, state=state).delete()
+        db.session.commit()
+    areas.area_ids.delete((city, state))
+
+
+def run(app, detail_cache, iterations=20, search_term='blue', report=print):
+    city, state = CREATE_VENUE['city'], CREATE_VENUE['state']
+    with app.app_context():
+        venue_id = db.session.query(db.func.min(Venue.id)).scalar()
+        artist_id = db.session.query(db.func.min(Artist.id)).scalar()
+        last_ids = {model: db.session.query(db.func.max(model.id)).scalar() or 0
+                    for model, payload in CREATES.values()}
+        area_existed = Area.query.filter_by(city=city, state=state).count() > 0
+        engine = db.engine
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'after_cursor_execute', count)
+    client = app.test_client()
+    results = {}
+    try:
+        for name, (method, path, kwargs) in routes(venue_id, artist_id, search_term).items():
+            latencies = []
+            queries = []
+            errors = 0
+            for _ in range(iterations):
+                detail_cache.delete(f'venue:{venue_id}', f'artist:{artist_id}')
+                del statements[:]
+                started = time.perf_counter()
+                response = getattr(client, method)(path, **kwargs)
+                response.get_data()  # drain streamed bodies
+                latencies.append((time.perf_counter() - started) * 1000)
+                queries.append(len(statements))
+                errors += response.status_code >= 400
+                if name in CREATES:
+                    model, payload = CREATES[name]
+                    delete_created(app, model, payload, last_ids[model])
+            results[name] = {
+                "p50_ms": round(percentile(latencies, 0.50), 3),
+                "p95_ms": round(percentile(latencies, 0.95), 3),
+                "p99_ms": round(percentile(latencies, 0.99), 3),
+                "max_ms": round(max(latencies), 3),
+                "queries": max(queries),
+                "errors": errors,
+            }
+            report(f'{name:24} p50 {results[name]["p50_ms"]:9.2f}ms  '
+                   f'p95 {results[name]["p95_ms"]:9.2f}ms  queries {results[name]["queries"]}')
+    finally:
+        event.remove(engine, 'after_cursor_execute', count)
+        if not area_existed:
+            delete_area(app, city, state)
+    return results
+
+
+def regressions(results, baseline, tolerance=0.2):
+    found = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result["p50_ms"] > before["p50_ms"] * (1 + tolerance):
+            found.append(f'{name}: p50 {before["p50_ms"]}ms -> {result["p50_ms"]}ms')
+        if result["queries"] > before["queries"]:
+            found.append(f'{name}: queries {before["queries"]} -> {result["queries"]}')
+        if result["errors"] > before["errors"]:
+            found.append(f'{name}: errors {before["errors"]} -> {result["errors"]}')
+    return found
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(path, results):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
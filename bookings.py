@@ -0,0 +1,85 @@
+from datetime import timedelta
+
+from models import db, Venue, Artist, Show
+
+# ----------------------------------------------------------------------------#
+# Show bookings.
+#
+# A show occupies [start_time, end_time), and no venue or artist may be booked
+# for two shows that overlap. On Postgres this is enforced by two exclusion
+# constraints over (venue_id, tsrange) and (artist_id, tsrange), created by
+# migration 5a1c93e0b7d4; they hold for concurrent writers and bulk imports.
+# Everywhere else create_show_submission checks first, and since no show is
+# longer than MAX_DURATION the check is a range scan of the (venue_id,
+# start_time) / (artist_id, start_time) indexes.
+# ----------------------------------------------------------------------------#
+
+DEFAULT_DURATION = timedelta(hours=2)
+MAX_DURATION = timedelta(hours=24)
+
+# the widest range one availability request may ask about
+MAX_AVAILABILITY_RANGE = timedelta(days=366)
+
+# Postgres constraint name -> what is double-booked
+EXCLUSIONS = {
+    'ex_show_venue_overlap': 'venue',
+    'ex_show_artist_overlap': 'artist',
+}
+
+
+def overlapping(owner_column, owner_id, start, end):
+    # shows of one venue/artist that meet [start, end); anything starting
+    # MAX_DURATION or more before `start` has ended by then
+    return db.and_(
+        owner_column == owner_id,
+        Show.start_time < end,
+        Show.start_time > start - MAX_DURATION,
+        Show.end_time > start)
+
+
+def check(venue_id, artist_id, start, end):
+    # one query: (venue exists, artist exists, id of a show the venue is
+    # already booked for then, id of one the artist is)
+    def first_show(owner_column, owner_id):
+        return db.select(Show.id).where(
+            overlapping(owner_column, owner_id, start, end)).limit(1).scalar_subquery()
+    return db.session.query(
+        db.exists().where(Venue.id == venue_id),
+        db.exists().where(Artist.id == artist_id),
+        first_show(Show.venue_id, venue_id),
+        first_show(Show.artist_id, artist_id)).one()
+
+
+def violated(error):
+    # 'venue' / 'artist' when an IntegrityError came from an exclusion
+    # constraint, else None
+    message = str(getattr(error, 'orig', error))
+    for name, booked in EXCLUSIONS.items():
+        if name in message:
+            return booked
+    return None
+
+
+def free_slots(venue_id, start, end, min_length=timedelta(0)):
+    # gaps of at least min_length in a venue's bookings over [start, end),
+    # or None if there is no such venue. One query: the venue outer joined to
+    # the shows that meet the range, in start order
+    rows = db.session.execute(
+        db.select(Venue.id, Show.start_time, Show.end_time)
+        .outerjoin(Show, overlapping(Show.venue_id, Venue.id, start, end))
+        .where(Venue.id == venue_id)
+        .order_by(Show.start_time)
+    ).all()
+    if not rows:
+        return None
+    slots = []
+    free_from = start
+    for _, booked_from, booked_until in rows:
+        if booked_from is None:
+            continue
+        if booked_from > free_from and booked_from - free_from >= min_length:
+            slots.append((free_from, booked_from))
+        free_from = max(free_from, booked_until)
+    if end > free_from and end - free_from >= min_length:
+        slots.append((free_from, end))
+    return slots
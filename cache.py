@@ -0,0 +1,112 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+# ----------------------------------------------------------------------------#
+# Detail page cache.
+#
+# Holds the venue/artist payload dicts built by show_venue() and show_artist().
+# Both backends share get/set/delete/stats; pick one with DETAIL_CACHE_BACKEND.
+# ----------------------------------------------------------------------------#
+
+
+class LRUCache:
+    # in-process, per worker; least recently used entries go first once
+    # max_size is reached, and entries older than ttl seconds are misses
+
+    def __init__(self, max_size=1024, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                    self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            "backend": "memory",
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class RedisCache:
+    # shared between workers and hosts; values are stored as JSON and expiry
+    # and eviction are left to redis (hit/miss counts are per worker)
+
+    def __init__(self, url, ttl=60, prefix='fyyur:'):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self._redis.get(self.prefix + key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(value)
+
+    def set(self, key, value):
+        self._redis.set(self.prefix + key, json.dumps(value), ex=self.ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self._redis.delete(*[self.prefix + key for key in keys])
+
+    def stats(self):
+        info = self._redis.info('stats')
+        return {
+            "backend": "redis",
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": info.get('evicted_keys', 0),
+        }
+
+
+def create_cache(config):
+    if config.get('DETAIL_CACHE_BACKEND', 'memory') == 'redis':
+        return RedisCache(config['DETAIL_CACHE_REDIS_URL'],
+                          ttl=config.get('DETAIL_CACHE_TTL', 60))
+    return LRUCache(max_size=config.get('DETAIL_CACHE_SIZE', 1024),
+                    ttl=config.get('DETAIL_CACHE_TTL', 60))
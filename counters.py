@@ -0,0 +1,83 @@
+from datetime import datetime
+
+from models import db, Venue, Artist, Show
+
+# ----------------------------------------------------------------------------#
+# Upcoming show counters.
+#
+# Venue.num_upcoming_shows and Artist.num_upcoming_shows count the shows still
+# flagged Show.upcoming. They are adjusted in the same transaction whenever a
+# show is added or removed, and rollover_shows() moves shows whose start_time
+# has passed over to past in bulk. Run it on a schedule (`flask rollover-shows`
+# from cron every few minutes) to keep the counts current.
+#
+# All updates are done in SQL (col = col + n) so concurrent writers don't lose
+# increments.
+# ----------------------------------------------------------------------------#
+
+
+def _adjust(venue_id, artist_id, delta):
+    db.session.query(Venue).filter_by(id=venue_id).update(
+        {Venue.num_upcoming_shows: Venue.num_upcoming_shows + delta},
+        synchronize_session=False)
+    db.session.query(Artist).filter_by(id=artist_id).update(
+        {Artist.num_upcoming_shows: Artist.num_upcoming_shows + delta},
+        synchronize_session=False)
+
+
+def _decrement_for(shows):
+    # subtract from each venue and artist the number of shows matching the
+    # shows criterion that belong to it
+    for model, show_column in ((Venue, Show.venue_id), (Artist, Show.artist_id)):
+        matched = db.session.query(db.func.count(Show.id)).filter(
+            shows, show_column == model.id).scalar_subquery()
+        db.session.query(model).filter(
+            model.id.in_(db.session.query(show_column).filter(shows))
+        ).update({model.num_upcoming_shows: model.num_upcoming_shows - matched},
+                 synchronize_session=False)
+
+
+def _upcoming(now):
+    # a show without a start time is never upcoming (and NULL > now is NULL,
+    # which the NOT NULL flag can't hold)
+    return db.and_(Show.start_time.isnot(None), Show.start_time > now)
+
+
+def show_added(show, now=None):
+    # call after the show is added to the session, before the commit
+    show.upcoming = show.start_time is not None and show.start_time > (now or datetime.now())
+    if show.upcoming:
+        _adjust(show.venue_id, show.artist_id, 1)
+
+
+def delete_shows(*criterion):
+    # bulk-delete the shows matching criterion and take the upcoming ones
+    # off their venues' and artists' counters, in the caller's transaction
+    removed = db.and_(Show.upcoming, *criterion)
+    _decrement_for(removed)
+    db.session.query(Show).filter(*criterion).delete(synchronize_session=False)
+
+
+def rollover_shows(now=None):
+    # flip every upcoming show that has started to past and take it off its
+    # venue's and artist's counters; returns the number of shows moved
+    now = now or datetime.now()
+    started = db.and_(Show.upcoming, Show.start_time <= now)
+    _decrement_for(started)
+    moved = db.session.query(Show).filter(started).update(
+        {Show.upcoming: False}, synchronize_session=False)
+    db.session.commit()
+    return moved
+
+
+def recount_upcoming_shows(now=None):
+    # rebuild every flag and counter from scratch (`flask recount-upcoming-shows`)
+    now = now or datetime.now()
+    db.session.query(Show).update(
+        {Show.upcoming: _upcoming(now)}, synchronize_session=False)
+    for model, show_column in ((Venue, Show.venue_id), (Artist, Show.artist_id)):
+        upcoming = db.session.query(db.func.count(Show.id)).filter(
+            Show.upcoming, show_column == model.id).scalar_subquery()
+        db.session.query(model).update(
+            {model.num_upcoming_shows: upcoming}, synchronize_session=False)
+    db.session.commit()
@@ -0,0 +1,66 @@
+from datetime import datetime
+from functools import lru_cache
+
+import dateutil.parser
+from babel import Locale
+import babel.dates
+from babel.dates import UTC, parse_pattern
+
+# ----------------------------------------------------------------------------#
+# Date formatting.
+#
+# Backs the `datetime` template filter. Values may be datetime objects (used
+# as they are) or strings (ISO 8601 goes through datetime.fromisoformat, and
+# only anything else falls back to dateutil). The babel pattern and locale
+# are compiled once per (format, locale) instead of on every call, and
+# format_all() formats a whole list of values against one compiled pattern.
+# ----------------------------------------------------------------------------#
+
+FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+
+@lru_cache(maxsize=64)
+def compiled(format='medium', locale='en'):
+    return parse_pattern(FORMATS.get(format, format)), Locale.parse(locale)
+
+
+def to_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return dateutil.parser.parse(value)
+
+
+def _apply(pattern, locale, value):
+    date = to_datetime(value)
+    if date.tzinfo is None:
+        # what babel.dates.format_datetime does with naive values
+        date = date.replace(tzinfo=UTC)
+    return pattern.apply(date, locale)
+
+
+def format_datetime(value, format='medium', locale='en'):
+    if format in ('long', 'short'):
+        # babel's own locale presets, not patterns
+        return babel.dates.format_datetime(to_datetime(value), format, locale=locale)
+    pattern, locale = compiled(format, locale)
+    return _apply(pattern, locale, value)
+
+
+def format_all(values, format='medium', locale='en'):
+    if format in ('long', 'short'):
+        return [format_datetime(value, format, locale) for value in values]
+    # shows often share a start time, so each distinct value is formatted once
+    pattern, locale = compiled(format, locale)
+    formatted = {}
+    result = []
+    for value in values:
+        if value not in formatted:
+            formatted[value] = _apply(pattern, locale, value)
+        result.append(formatted[value])
+    return result
@@ -0,0 +1,173 @@
+import threading
+from itertools import chain
+
+import sqlalchemy as sa
+from flask import current_app, has_app_context
+from sqlalchemy import event
+
+from models import db, Area, Venue, Show
+
+# ----------------------------------------------------------------------------#
+# Area directory.
+#
+# /venues lists every area with its venues and their upcoming show counts. It
+# is read far more often than it changes, so the rows are precomputed into
+# area_directory, keyed (area_id, venue_id) so the page is one ordered index
+# scan: a materialized view on Postgres, refreshed CONCURRENTLY so readers are
+# never blocked, and a summary table rebuilt in one transaction elsewhere.
+#
+# A commit that touched areas, venues or shows schedules a refresh
+# DIRECTORY_REFRESH_DELAY seconds later; writes landing before it runs share
+# it. The importer and the counter commands refresh before they return, and
+# `flask refresh-directory` does the same from cron.
+# ----------------------------------------------------------------------------#
+
+# venue_id is 0 for an area without venues: the concurrent refresh needs a
+# unique index, and NULLs would never match between the old and new rows
+area_directory = sa.Table(
+    'area_directory', sa.MetaData(),
+    sa.Column('area_id', sa.Integer, primary_key=True),
+    sa.Column('venue_id', sa.Integer, primary_key=True),
+    sa.Column('city', sa.String(120)),
+    sa.Column('state', sa.String(120)),
+    sa.Column('venue_name', sa.String),
+    sa.Column('num_upcoming_shows', sa.Integer),
+    sa.Column('updated_at', sa.DateTime, index=True),
+)
+
+TRACKED = (Area, Venue, Show)
+
+_lock = threading.Lock()
+_pending = None
+
+
+def directory_select(dialect):
+    if dialect == 'postgresql':
+        # GREATEST skips NULLs
+        updated_at = sa.func.greatest(Area.updated_at, Venue.updated_at)
+    else:
+        # SQLite's two-argument MAX() is NULL if either side is
+        updated_at = sa.func.max(sa.func.coalesce(Area.updated_at, Venue.updated_at),
+                                 sa.func.coalesce(Venue.updated_at, Area.updated_at))
+    return db.select(
+        Area.id.label('area_id'),
+        sa.func.coalesce(Venue.id, 0).label('venue_id'),
+        Area.city, Area.state,
+        Venue.name.label('venue_name'),
+        Venue.num_upcoming_shows,
+        updated_at.label('updated_at'),
+    ).select_from(Area).outerjoin(Venue, Venue.area_id == Area.id)
+
+
+def create_directory(engine):
+    # Postgres and existing databases get this from the migration; this
+    # covers databases built with `flask create-schema`
+    with engine.begin() as connection:
+        if connection.dialect.name == 'postgresql':
+            query = directory_select('postgresql').compile(
+                connection, compile_kwargs={'literal_binds': True})
+            connection.exec_driver_sql(
+                f'CREATE MATERIALIZED VIEW IF NOT EXISTS area_directory AS {query}')
+            connection.exec_driver_sql(
+                'CREATE UNIQUE INDEX IF NOT EXISTS ux_area_directory '
+                'ON area_directory (area_id, venue_id)')
+            connection.exec_driver_sql(
+                'CREATE INDEX IF NOT EXISTS ix_area_directory_updated_at '
+                'ON area_directory (updated_at)')
+        else:
+            area_directory.create(connection, checkfirst=True)
+            refresh(connection)
+
+
+def refresh(connection=None):
+    connection = connection or db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        connection.exec_driver_sql('REFRESH MATERIALIZED VIEW CONCURRENTLY area_directory')
+        return
+    connection.execute(area_directory.delete())
+    connection.execute(area_directory.insert().from_select(
+        [column.name for column in area_directory.columns],
+        directory_select(connection.dialect.name)))
+
+
+def statement():
+    # the page's rows, in the order venues.html groups them
+    return db.select(
+        area_directory.c.area_id, area_directory.c.city, area_directory.c.state,
+        sa.func.nullif(area_directory.c.venue_id, 0).label('venue_id'),
+        area_directory.c.venue_name, area_directory.c.num_upcoming_shows
+    ).order_by(area_directory.c.area_id, area_directory.c.venue_id)
+
+
+def validators():
+    return (db.select(sa.func.max(area_directory.c.updated_at)),
+            db.select(sa.func.count()).select_from(area_directory))
+
+
+#  Debounced refresh
+#  ----------------------------------------------------------------
+
+def _run_refresh(app):
+    global _pending
+    with _lock:
+        # writes from here on schedule the next refresh
+        _pending = None
+    with app.app_context():
+        try:
+            refresh()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            app.logger.exception('area directory refresh failed')
+        finally:
+            db.session.remove()
+
+
+def schedule_refresh(app):
+    global _pending
+    delay = app.config.get('DIRECTORY_REFRESH_DELAY')
+    if delay is None or delay < 0:
+        return
+    with _lock:
+        if _pending is not None:
+            return
+        _pending = threading.Timer(delay, _run_refresh, args=(app,))
+        # CLI commands that write refresh before they exit instead of
+        # waiting on this
+        _pending.daemon = True
+        _pending.start()
+
+
+def mark_stale(session):
+    session.info['directory_stale'] = True
+
+
+def after_flush(session, flush_context):
+    if any(isinstance(obj, TRACKED) for obj in chain(session.new, session.dirty, session.deleted)):
+        mark_stale(session)
+
+
+def after_bulk(update_context):
+    if issubclass(update_context.mapper.class_, TRACKED):
+        mark_stale(update_context.session)
+
+
+def after_commit(session):
+    if session.info.pop('directory_stale', False) and has_app_context():
+        schedule_refresh(current_app._get_current_object())
+
+
+def after_rollback(session):
+    session.info.pop('directory_stale', None)
+
+
+def init_app(app):
+    app.config.setdefault('DIRECTORY_REFRESH_DELAY', 5)
+    # session events are global, so only attach them once per process
+    for name, listener in (('after_flush', after_flush),
+                           ('after_bulk_update', after_bulk),
+                           ('after_bulk_delete', after_bulk),
+                           ('after_commit', after_commit),
+                           ('after_rollback', after_rollback)):
+        if not event.contains(db.session, name, listener):
+            event.listen(db.session, name, listener)
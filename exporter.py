@@ -0,0 +1,90 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+
+from models import db, Area, Venue, Artist, Show
+
+# ----------------------------------------------------------------------------#
+# Catalog export.
+#
+# Rows come straight off a server-side cursor (stream_results + yield_per) and
+# are turned into CSV or JSONL chunks as they arrive, so memory stays constant
+# and the first bytes go out before the query has finished. The columns match
+# what `flask import` reads back.
+# ----------------------------------------------------------------------------#
+
+EXPORT_BATCH_SIZE = 1000
+
+KINDS = ('venues', 'artists', 'shows')
+
+
+def export_query(kind):
+    if kind == 'venues':
+        return db.session.query(
+            Venue.id, Venue.name, Area.city, Area.state, Venue.address, Venue.phone,
+            Venue.genres, Venue.image_link, Venue.facebook_link, Venue.website,
+            Venue.seeking_talent, Venue.seeking_description
+        ).join(Area, Venue.area_id == Area.id).order_by(Venue.id)
+    if kind == 'artists':
+        return db.session.query(
+            Artist.id, Artist.name, Area.city, Area.state, Artist.phone,
+            Artist.genres, Artist.image_link, Artist.facebook_link
+        ).outerjoin(Area, Artist.area_id == Area.id).order_by(Artist.id)
+    return db.session.query(
+        Show.id, Show.venue_id, Show.artist_id, Show.start_time, Show.end_time
+    ).order_by(Show.id)
+
+
+def stream_rows(kind):
+    # (column names, row iterator); nothing is executed until iteration
+    query = export_query(kind)
+    columns = [column['name'] for column in query.column_descriptions]
+    rows = query.execution_options(stream_results=True).yield_per(EXPORT_BATCH_SIZE)
+    return columns, rows
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def csv_chunks(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def jsonl_chunks(columns, rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, row)), default=_json_default))
+        if len(lines) == EXPORT_BATCH_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=31)  # 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_chunks(kind, fmt='csv', gzip=False):
+    columns, rows = stream_rows(kind)
+    chunks = (csv_chunks if fmt == 'csv' else jsonl_chunks)(columns, rows)
+    return gzip_chunks(chunks) if gzip else (chunk.encode() for chunk in chunks)
@@ -1,7 +1,10 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from flask_wtf import Form
-from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField
-from wtforms.validators import DataRequired, AnyOf, URL
+from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField, IntegerField
+from wtforms.validators import DataRequired, AnyOf, URL, NumberRange
+
+import bookings
+
 
 class ShowForm(Form):
     artist_id = StringField(
@@ -15,6 +18,11 @@ class ShowForm(Form):
         validators=[DataRequired()],
         default= datetime.today()
     )
+    duration = IntegerField(
+        'duration',
+        validators=[DataRequired(), NumberRange(min=1, max=bookings.MAX_DURATION // timedelta(minutes=1))],
+        default=120
+    )
 
 class VenueForm(Form):
     name = StringField(
@@ -0,0 +1,156 @@
+from itertools import chain
+
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Genre, Venue, Artist, venue_genre, artist_genre
+from cache import LRUCache
+
+# ----------------------------------------------------------------------------#
+# Genre index.
+#
+# Venue/Artist.genres keeps the comma-separated names the forms submit, and
+# the venue_genre/artist_genre association tables mirror it so a genre filter
+# is an index lookup instead of a LIKE over every row. Rows written through
+# the ORM are relinked when the session flushes; the bulk importer, which
+# bypasses the ORM, calls link_missing() once it's done.
+#
+# Genre ids are cached per process like area ids: only ones that were already
+# in the database, since one we just inserted could still be rolled back.
+# ----------------------------------------------------------------------------#
+
+GENRE_CACHE_SIZE = 1024
+
+ASSOCIATIONS = {
+    Venue: (venue_genre, venue_genre.c.venue_id),
+    Artist: (artist_genre, artist_genre.c.artist_id),
+}
+
+genre_ids = LRUCache(max_size=GENRE_CACHE_SIZE, ttl=float('inf'))
+
+
+def parse(value):
+    # 'Jazz, Blues' / ['Jazz', 'Blues'] / '{Jazz,Blues}' -> ['Jazz', 'Blues']
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.strip('{}').split(',')
+    names = (name.strip().strip('"').strip() for name in value)
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def _select_ids(connection, names):
+    rows = connection.execute(db.select(Genre.name, Genre.id).where(Genre.name.in_(names)))
+    return dict(rows.all())
+
+
+def _insert(connection, names):
+    rows = [{'name': name} for name in names]
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        connection.execute(postgresql.insert(Genre).on_conflict_do_nothing(
+            index_elements=['name']), rows)
+    elif dialect == 'sqlite':
+        connection.execute(sqlite.insert(Genre).on_conflict_do_nothing(), rows)
+    else:
+        for row in rows:
+            try:
+                with connection.begin_nested():
+                    connection.execute(db.insert(Genre), row)
+            except IntegrityError:
+                pass
+
+
+def resolve_genre_ids(connection, names):
+    ids = {}
+    for name in names:
+        genre_id = genre_ids.get(name)
+        if genre_id is not None:
+            ids[name] = genre_id
+    missing = [name for name in names if name not in ids]
+    if missing:
+        existing = _select_ids(connection, missing)
+        for name, genre_id in existing.items():
+            genre_ids.set(name, genre_id)
+        ids.update(existing)
+        missing = [name for name in missing if name not in existing]
+    if missing:
+        _insert(connection, missing)
+        ids.update(_select_ids(connection, missing))
+    return ids
+
+
+def link(connection, model, owners):
+    # owners: {owner id: genres value}; replaces whatever was linked before
+    if not owners:
+        return
+    table, owner_column = ASSOCIATIONS[model]
+    names = {owner_id: parse(value) for owner_id, value in owners.items()}
+    ids = resolve_genre_ids(connection, sorted(set(chain.from_iterable(names.values()))))
+    connection.execute(table.delete().where(owner_column.in_(list(owners))))
+    rows = [{owner_column.name: owner_id, 'genre_id': ids[name]}
+            for owner_id, owner_names in names.items() for name in owner_names]
+    if rows:
+        connection.execute(table.insert(), rows)
+
+
+def unlink(connection, model, owner_ids):
+    table, owner_column = ASSOCIATIONS[model]
+    connection.execute(table.delete().where(owner_column.in_(list(owner_ids))))
+
+
+def link_missing(model, batch_size=5000):
+    # links every row that has genres but no associations yet, e.g. after a
+    # bulk import; returns how many rows were linked
+    table, owner_column = ASSOCIATIONS[model]
+    unlinked = db.select(model.id, model.genres).where(
+        model.genres.isnot(None),
+        ~db.exists().where(owner_column == model.id)
+    ).order_by(model.id)
+    connection = db.session.connection()
+    total = 0
+    last_id = 0
+    while True:
+        # keyset pagination: rows whose genres parse to nothing stay unlinked
+        batch = connection.execute(unlinked.where(model.id > last_id).limit(batch_size)).all()
+        if not batch:
+            return total
+        last_id = batch[-1][0]
+        owners = {owner_id: value for owner_id, value in batch if parse(value)}
+        link(connection, model, owners)
+        total += len(owners)
+
+
+def owners(model, name):
+    # ids of the venues/artists tagged with genre `name`, for an IN filter
+    table, owner_column = ASSOCIATIONS[model]
+    return db.select(owner_column).join(Genre, Genre.id == table.c.genre_id).where(Genre.name == name)
+
+
+def before_flush(session, flush_context, instances):
+    deleted = {}
+    for obj in session.deleted:
+        if type(obj) in ASSOCIATIONS:
+            deleted.setdefault(type(obj), []).append(obj.id)
+    for model, owner_ids in deleted.items():
+        unlink(session.connection(), model, owner_ids)
+
+
+def after_flush(session, flush_context):
+    # new and dirty still hold their pre-flush state here, but ids are assigned
+    changed = {}
+    for obj in chain(session.new, session.dirty):
+        if type(obj) not in ASSOCIATIONS:
+            continue
+        if obj in session.new or inspect(obj).attrs.genres.history.has_changes():
+            changed.setdefault(type(obj), {})[obj.id] = obj.genres
+    for model, owners in changed.items():
+        link(session.connection(), model, owners)
+
+
+def init_app(app):
+    # session events are global, so only attach them once per process
+    for name, listener in (('before_flush', before_flush), ('after_flush', after_flush)):
+        if not event.contains(db.session, name, listener):
+            event.listen(db.session, name, listener)
@@ -0,0 +1,175 @@
+import csv
+import io
+import json
+import time
+from datetime import datetime
+
+import dateutil.parser
+
+from models import db, Area, Venue, Artist, Show
+import counters
+import genres
+import directory
+import bookings
+from areas import resolve_area_id
+
+# ----------------------------------------------------------------------------#
+# Bulk import.
+#
+# Rows are streamed from a CSV or JSONL file and written in batches: COPY on
+# Postgres, executemany everywhere else. Only one batch is held in memory.
+# Venues and artists are given as city/state and resolved to area ids through
+# an in-memory (city, state) -> id map, creating areas as they first appear.
+# Shows refer to existing venue_id/artist_id and last DEFAULT_DURATION unless
+# an end_time is given; one more than bookings.MAX_DURATION after the start
+# stops the import. Only Postgres rejects overlapping shows here (its
+# exclusion constraints); elsewhere imported shows are taken as they are.
+# Times with a UTC offset are converted to local time, which is what the app
+# stores and compares against.
+# ----------------------------------------------------------------------------#
+
+TRUE_VALUES = ('y', 'yes', 'true', 't', '1')
+
+FIELDS = {
+    'venues': ['id', 'name', 'address', 'phone', 'genres', 'image_link', 'facebook_link',
+               'website', 'seeking_talent', 'seeking_description'],
+    'artists': ['id', 'name', 'phone', 'genres', 'image_link', 'facebook_link'],
+    'shows': ['id', 'venue_id', 'artist_id', 'start_time', 'end_time'],
+}
+
+MODELS = {'venues': Venue, 'artists': Artist, 'shows': Show}
+
+
+def read_rows(path, fmt):
+    with open(path, newline='') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class AreaMap:
+    # (city, state) -> area id, loaded once and extended as new areas appear
+
+    def __init__(self):
+        self.ids = {(city, state): id for id, city, state
+                    in db.session.query(Area.id, Area.city, Area.state)}
+
+    def resolve(self, city, state):
+        key = (city, state)
+        if key not in self.ids:
+            self.ids[key] = resolve_area_id(city, state)
+        return self.ids[key]
+
+
+def parse_time(value):
+    parsed = dateutil.parser.parse(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def convert(kind, row, areas, now):
+    values = {field: row.get(field) for field in FIELDS[kind]
+              if row.get(field) not in (None, '')}
+    if kind == 'shows':
+        values['venue_id'] = int(values['venue_id'])
+        values['artist_id'] = int(values['artist_id'])
+        values['start_time'] = parse_time(values['start_time'])
+        if 'end_time' in values:
+            values['end_time'] = parse_time(values['end_time'])
+            # the overlap check and free_slots() only look MAX_DURATION back
+            if not values['start_time'] < values['end_time'] <= values['start_time'] + bookings.MAX_DURATION:
+                raise ValueError(f'show {row!r}: end_time must be after start_time and at most '
+                                 f'{bookings.MAX_DURATION.total_seconds() / 3600:g} hours later')
+        else:
+            values['end_time'] = values['start_time'] + bookings.DEFAULT_DURATION
+        values['upcoming'] = values['start_time'] > now
+    else:
+        values['area_id'] = areas.resolve(row.get('city'), row.get('state'))
+        values['num_upcoming_shows'] = 0
+        if kind == 'venues':
+            values['seeking_talent'] = str(values.get('seeking_talent', '')).lower() in TRUE_VALUES
+    if 'id' in values:
+        values['id'] = int(values['id'])
+    values['updated_at'] = datetime.utcnow()
+    return values
+
+
+def copy_field(value):
+    # NULL is an unquoted \N (see COPY_OPTIONS); every string is quoted, so
+    # neither '' nor a literal '\N' can be read back as NULL
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return str(value)
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+COPY_OPTIONS = "FORMAT csv, NULL '\\N'"
+
+
+def copy_text(columns, batch):
+    return ''.join(','.join(copy_field(values.get(column)) for column in columns) + '\n'
+                   for values in batch)
+
+
+def copy_batch(table, batch):
+    # COPY ... FROM STDIN in csv format
+    columns = sorted({column for values in batch for column in values})
+    buffer = io.StringIO(copy_text(columns, batch))
+    cursor = db.session.connection().connection.cursor()
+    cursor.copy_expert(
+        f'COPY {table.name} ({", ".join(columns)}) FROM STDIN WITH ({COPY_OPTIONS})', buffer)
+
+
+def insert_batch(table, batch):
+    # executemany needs every row to carry the same keys
+    columns = {column for values in batch for column in values}
+    db.session.execute(table.insert(),
+                       [{column: values.get(column) for column in columns} for values in batch])
+
+
+def import_rows(kind, rows, batch_size=5000, report=print):
+    table = MODELS[kind].__table__
+    dialect = db.session.get_bind().dialect.name
+    write_batch = copy_batch if dialect == 'postgresql' else insert_batch
+    areas = AreaMap() if kind != 'shows' else None
+    now = datetime.now()
+
+    started = time.monotonic()
+    total = 0
+    batch = []
+    for row in rows:
+        batch.append(convert(kind, row, areas, now))
+        if len(batch) >= batch_size:
+            write_batch(table, batch)
+            total += len(batch)
+            batch = []
+            report(f'{total} {kind} ({total / (time.monotonic() - started):.0f} rows/s)')
+    if batch:
+        write_batch(table, batch)
+        total += len(batch)
+
+    if dialect == 'postgresql':
+        # explicit ids don't advance the serial sequence
+        db.session.execute(db.text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+            f"COALESCE(MAX(id), 1)) FROM {table.name}"))
+    db.session.commit()
+    if kind == 'shows':
+        counters.recount_upcoming_shows(now)
+    else:
+        # COPY/executemany bypass the session hooks that maintain the genre index
+        genres.link_missing(MODELS[kind], batch_size)
+        db.session.commit()
+    directory.refresh()
+    db.session.commit()
+
+    elapsed = time.monotonic() - started
+    report(f'imported {total} {kind} in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f} rows/s)')
+    return total
@@ -0,0 +1,107 @@
+import time
+from collections import Counter
+
+from flask import current_app, g, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# ----------------------------------------------------------------------------#
+# Per-request SQL instrumentation.
+#
+# Every statement run during a request is counted and timed. Responses carry a
+# Server-Timing header (db, render, total), and a SELECT whose text repeats
+# more than SQL_REPEAT_THRESHOLD times in one request (the usual N+1 lazy-load
+# pattern) is logged, or raised as RepeatedQueryError when SQL_REPEAT_RAISE is
+# set (it defaults to on in debug and testing).
+# ----------------------------------------------------------------------------#
+
+
+class RepeatedQueryError(Exception):
+    pass
+
+
+def _new_stats():
+    return {"count": 0, "db": 0.0, "render": 0.0, "shapes": Counter()}
+
+
+def _stats():
+    if not has_request_context():
+        return None
+    if 'sql_stats' not in g:
+        g.sql_stats = _new_stats()
+    return g.sql_stats
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    stats = _stats()
+    if stats is None:
+        return
+    stats["count"] += 1
+    stats["db"] += elapsed
+    if not statement.lstrip().upper().startswith('SELECT'):
+        return
+    # parameters are bound separately, so the text is the statement's shape
+    stats["shapes"][statement] += 1
+    repeats = stats["shapes"][statement]
+    threshold = current_app.config['SQL_REPEAT_THRESHOLD']
+    if repeats == threshold + 1:
+        message = (f'{request.method} {request.path}: the same SELECT ran more '
+                   f'than {threshold} times in one request (N+1?):\n{statement}')
+        if current_app.config['SQL_REPEAT_RAISE']:
+            raise RepeatedQueryError(message)
+        current_app.logger.warning(message)
+
+
+def handle_error(exception_context):
+    # a failed statement never reaches after_cursor_execute
+    started = exception_context.connection.info.get('query_started') \
+        if exception_context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def init_app(app):
+    app.config.setdefault('SQL_REPEAT_THRESHOLD', 10)
+    app.config.setdefault('SQL_REPEAT_RAISE', app.debug or app.testing)
+
+    # engine events are global, so only attach them once per process
+    for name, listener in (('before_cursor_execute', before_cursor_execute),
+                           ('after_cursor_execute', after_cursor_execute),
+                           ('handle_error', handle_error)):
+        if not event.contains(Engine, name, listener):
+            event.listen(Engine, name, listener)
+
+    @before_render_template.connect_via(app)
+    def render_started(sender, template, context, **extra):
+        g.render_started = time.perf_counter()
+
+    @template_rendered.connect_via(app)
+    def render_finished(sender, template, context, **extra):
+        stats = _stats()
+        started = g.pop('render_started', None)
+        if stats is not None and started is not None:
+            stats["render"] += time.perf_counter() - started
+
+    @app.before_request
+    def start_timer():
+        # g lives on the app context, which requests share when one was
+        # pushed around them (CLI commands, tests), so start from zero
+        g.sql_stats = _new_stats()
+        g.pop('render_started', None)
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def server_timing(response):
+        stats = _stats()
+        total = time.perf_counter() - g.get('request_started', time.perf_counter())
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={stats["db"] * 1000:.2f};desc="{stats["count"]} queries", '
+            f'render;dur={stats["render"] * 1000:.2f}, '
+            f'total;dur={total * 1000:.2f}')
+        return response
@@ -0,0 +1,152 @@
+import bisect
+import json
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import request
+
+# ----------------------------------------------------------------------------#
+# Access-log recording and replay.
+#
+# With REPLAY_LOG_PATH set, every request the app serves is appended to that
+# file as one JSON line: {"t", "method", "path", "form" | "json"}. replay()
+# sends such a log to a running server (or to the app on a local werkzeug
+# server started for the run) with the original spacing divided by `speed`,
+# at most `concurrency` requests in flight, and reports throughput, per-route
+# latency histograms and error rates.
+# ----------------------------------------------------------------------------#
+
+HISTOGRAM_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+
+def init_app(app):
+    path = app.config.get('REPLAY_LOG_PATH')
+    if not path:
+        return
+    lock = threading.Lock()
+
+    @app.after_request
+    def record_request(response):
+        entry = {"t": time.time(), "method": request.method, "path": request.full_path.rstrip('?')}
+        if request.is_json:
+            entry["json"] = request.get_json(silent=True)
+        elif request.form:
+            entry["form"] = request.form.to_dict(flat=False)
+        with lock, open(path, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+        return response
+
+
+def read_log(path):
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def route_name(method, path):
+    # /venues/12?x=1 -> GET /venues/<id>
+    return method + ' ' + re.sub(r'/\d+(?=/|$)', '/<id>', path.split('?')[0])
+
+
+def send(base_url, entry, timeout):
+    data = None
+    headers = {}
+    if entry.get("json") is not None:
+        data = json.dumps(entry["json"]).encode()
+        headers['Content-Type'] = 'application/json'
+    elif entry.get("form"):
+        data = urllib.parse.urlencode(entry["form"], doseq=True).encode()
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+    req = urllib.request.Request(base_url + entry["path"], data=data, headers=headers,
+                                 method=entry["method"])
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as error:
+        status = error.code
+    except (urllib.error.URLError, OSError):
+        status = None
+    return status, (time.perf_counter() - started) * 1000
+
+
+class Results:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def add(self, route, status, latency):
+        with self.lock:
+            self.latencies[route].append(latency)
+            if status is None or status >= 500:
+                self.errors[route] += 1
+
+    def summary(self, elapsed):
+        routes = {}
+        for route, latencies in sorted(self.latencies.items()):
+            ordered = sorted(latencies)
+            counts = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+            for latency in ordered:
+                counts[bisect.bisect_left(HISTOGRAM_BUCKETS_MS, latency)] += 1
+            labels = [f'<={bound}ms' for bound in HISTOGRAM_BUCKETS_MS] + [f'>{HISTOGRAM_BUCKETS_MS[-1]}ms']
+            histogram = dict(zip(labels, counts))
+            routes[route] = {
+                "requests": len(ordered),
+                "error_rate": round(self.errors[route] / len(ordered), 4),
+                "p50_ms": round(ordered[len(ordered) // 2], 3),
+                "p95_ms": round(ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)], 3),
+                "p99_ms": round(ordered[min(int(len(ordered) * 0.99), len(ordered) - 1)], 3),
+                "histogram": histogram,
+            }
+        total = sum(route["requests"] for route in routes.values())
+        return {
+            "requests": total,
+            "errors": sum(self.errors.values()),
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+            "routes": routes,
+        }
+
+
+def replay(entries, base_url, concurrency=8, speed=1.0, timeout=30):
+    # speed=0 sends as fast as the workers allow
+    results = Results()
+    slots = threading.Semaphore(concurrency)
+    first = None
+    started = time.perf_counter()
+
+    def worker(entry):
+        try:
+            status, latency = send(base_url, entry, timeout)
+            results.add(route_name(entry["method"], entry["path"]), status, latency)
+        finally:
+            slots.release()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for entry in entries:
+            if speed and "t" in entry:
+                first = entry["t"] if first is None else first
+                delay = (entry["t"] - first) / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            slots.acquire()
+            executor.submit(worker, entry)
+    return results.summary(time.perf_counter() - started)
+
+
+def serve(app):
+    # the app on a local threaded werkzeug server; returns (base url, server)
+    from werkzeug.serving import make_server
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}', server
@@ -0,0 +1,36 @@
+"""updated_at columns for conditional GET
+
+Revision ID: 039078e8b093
+Revises: 2e8b6fb79429
+Create Date: 2026-10-18 12:41:33.902716
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '039078e8b093'
+down_revision = '2e8b6fb79429'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # no server default: SQLite can't add a column with a non-constant one, so
+    # existing rows are stamped here and the models fill it in from now on
+    now = datetime.utcnow()
+    for table in ('area', 'venue', 'artist', 'show'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute(sa.text(f'UPDATE {table} SET updated_at = :now').bindparams(now=now))
+    for table in ('area', 'venue', 'artist'):
+        op.create_index(f'ix_{table}_updated_at', table, ['updated_at'])
+
+
+def downgrade():
+    for table in ('area', 'venue', 'artist'):
+        op.drop_index(f'ix_{table}_updated_at', table_name=table)
+    for table in ('area', 'venue', 'artist', 'show'):
+        op.drop_column(table, 'updated_at')
@@ -0,0 +1,32 @@
+"""make the upcoming show index partial
+
+Revision ID: 0426c4227d56
+Revises: 039078e8b093
+Create Date: 2026-10-18 13:55:12.640871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0426c4227d56'
+down_revision = '039078e8b093'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # the index behind counters.rollover_shows(). with (upcoming, start_time)
+    # the planner could also pick it for the correlated per-venue counts in
+    # counters.recount_upcoming_shows(), scanning every upcoming show once per
+    # venue; partial on upcoming it only serves the rollover scan
+    op.drop_index('ix_show_upcoming_start_time', table_name='show')
+    op.create_index('ix_show_upcoming_start_time', 'show', ['start_time'],
+                    postgresql_where=sa.text('upcoming'),
+                    sqlite_where=sa.text('upcoming = 1'))
+
+
+def downgrade():
+    op.drop_index('ix_show_upcoming_start_time', table_name='show')
+    op.create_index('ix_show_upcoming_start_time', 'show', ['upcoming', 'start_time'])
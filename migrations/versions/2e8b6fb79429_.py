@@ -0,0 +1,52 @@
+"""persisted upcoming show counters
+
+Revision ID: 2e8b6fb79429
+Revises: eb86cd9fe806
+Create Date: 2026-10-18 11:20:05.318420
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2e8b6fb79429'
+down_revision = 'eb86cd9fe806'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('show', sa.Column('upcoming', sa.Boolean(), nullable=False,
+                                    server_default=sa.false()))
+    op.add_column('artist', sa.Column('num_upcoming_shows', sa.Integer(), nullable=False,
+                                      server_default='0'))
+    op.create_index('ix_show_upcoming_start_time', 'show', ['upcoming', 'start_time'])
+
+    # the app compares against naive local time, so bind that rather than
+    # relying on the database's clock and time zone
+    op.execute(sa.text(
+        "UPDATE show SET upcoming = (start_time IS NOT NULL AND start_time > :now)"
+    ).bindparams(now=datetime.now()))
+    op.execute("""
+        UPDATE venue SET num_upcoming_shows = (
+            SELECT COUNT(*) FROM show WHERE show.venue_id = venue.id AND show.upcoming)
+    """)
+    op.execute("""
+        UPDATE artist SET num_upcoming_shows = (
+            SELECT COUNT(*) FROM show WHERE show.artist_id = artist.id AND show.upcoming)
+    """)
+    with op.batch_alter_table('venue') as batch_op:
+        batch_op.alter_column('num_upcoming_shows', existing_type=sa.Integer(),
+                              nullable=False, server_default='0')
+
+
+def downgrade():
+    with op.batch_alter_table('venue') as batch_op:
+        batch_op.alter_column('num_upcoming_shows', existing_type=sa.Integer(),
+                              nullable=True, server_default=None)
+    op.drop_index('ix_show_upcoming_start_time', table_name='show')
+    op.drop_column('artist', 'num_upcoming_shows')
+    op.drop_column('show', 'upcoming')
@@ -0,0 +1,88 @@
+"""show end times, no overlapping bookings on Postgres
+
+Revision ID: 5a1c93e0b7d4
+Revises: b41e6f0c9d25
+Create Date: 2026-10-18 23:12:48.906213
+
+"""
+from datetime import timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a1c93e0b7d4'
+down_revision = 'b41e6f0c9d25'
+branch_labels = None
+depends_on = None
+
+DEFAULT_DURATION = timedelta(hours=2)
+
+EXCLUSIONS = (('ex_show_venue_overlap', 'venue_id'), ('ex_show_artist_overlap', 'artist_id'))
+
+
+def backfill_postgres():
+    # existing shows last DEFAULT_DURATION, cut short where the venue or the
+    # artist has a later show starting sooner, so none overlap. Shows with the
+    # same start become empty ranges, which overlap nothing
+    op.execute(f"""
+        UPDATE show SET end_time = LEAST(show.start_time + interval '{int(DEFAULT_DURATION.total_seconds())} seconds',
+                                         later.venue_next, later.artist_next)
+        FROM (
+            SELECT id,
+                   LEAD(start_time) OVER (PARTITION BY venue_id ORDER BY start_time, id) AS venue_next,
+                   LEAD(start_time) OVER (PARTITION BY artist_id ORDER BY start_time, id) AS artist_next
+            FROM show
+        ) AS later
+        WHERE later.id = show.id AND show.start_time IS NOT NULL
+    """)
+
+
+def backfill(connection):
+    # same, done here for SQLite, whose date functions would rewrite the
+    # stored datetime strings in another format
+    show = sa.table('show', sa.column('id', sa.Integer), sa.column('venue_id', sa.Integer),
+                    sa.column('artist_id', sa.Integer), sa.column('start_time', sa.DateTime),
+                    sa.column('end_time', sa.DateTime))
+    rows = connection.execute(
+        sa.select(show.c.id, show.c.venue_id, show.c.artist_id, show.c.start_time)
+        .where(show.c.start_time.isnot(None))
+        .order_by(show.c.start_time.desc(), show.c.id.desc()))
+    next_start = {}
+    updates = []
+    for show_id, venue_id, artist_id, start_time in rows:
+        keys = (('venue', venue_id), ('artist', artist_id))
+        end_time = min([start_time + DEFAULT_DURATION] + [next_start[key] for key in keys if key in next_start])
+        for key in keys:
+            next_start[key] = start_time
+        updates.append({'show_id': show_id, 'end_time': end_time})
+    if updates:
+        connection.execute(
+            show.update().where(show.c.id == sa.bindparam('show_id'))
+            .values(end_time=sa.bindparam('end_time')),
+            updates)
+
+
+def upgrade():
+    op.add_column('show', sa.Column('end_time', sa.DateTime(), nullable=True))
+    connection = op.get_bind()
+    if connection.dialect.name != 'postgresql':
+        backfill(connection)
+        return
+    backfill_postgres()
+    # GiST needs btree_gist for the integer equality half
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    for name, column in EXCLUSIONS:
+        # tsrange(NULL, NULL) is unbounded, so shows without a time are left out
+        op.execute(
+            f'ALTER TABLE show ADD CONSTRAINT {name} EXCLUDE USING gist '
+            f'({column} WITH =, tsrange(start_time, end_time) WITH &&) '
+            f'WHERE (start_time IS NOT NULL AND end_time IS NOT NULL)')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for name, _ in EXCLUSIONS:
+            op.execute(f'ALTER TABLE show DROP CONSTRAINT {name}')
+    op.drop_column('show', 'end_time')
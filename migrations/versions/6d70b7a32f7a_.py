@@ -0,0 +1,73 @@
+"""normalized genre index for venues and artists
+
+Revision ID: 6d70b7a32f7a
+Revises: 0426c4227d56
+Create Date: 2026-10-18 20:41:37.508112
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6d70b7a32f7a'
+down_revision = '0426c4227d56'
+branch_labels = None
+depends_on = None
+
+OWNERS = (('venue', 'venue_genre', 'venue_id'), ('artist', 'artist_genre', 'artist_id'))
+
+
+def parse(value):
+    # same rules as genres.parse(); old rows may hold a Postgres array literal
+    if not value:
+        return []
+    names = (name.strip().strip('"').strip() for name in value.strip('{}').split(','))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def upgrade():
+    op.create_table(
+        'genre',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=120), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+    )
+    for owner, table, column in OWNERS:
+        op.create_table(
+            table,
+            sa.Column('genre_id', sa.Integer(), nullable=False),
+            sa.Column(column, sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['genre_id'], ['genre.id']),
+            sa.ForeignKeyConstraint([column], [f'{owner}.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('genre_id', column),
+        )
+        op.create_index(f'ix_{table}_{column}', table, [column])
+
+    # backfill from the existing strings
+    connection = op.get_bind()
+    owned = {}
+    for owner, table, column in OWNERS:
+        rows = connection.execute(sa.text(
+            f'SELECT id, genres FROM {owner} WHERE genres IS NOT NULL'))
+        owned[owner] = [(owner_id, parse(value)) for owner_id, value in rows]
+    names = sorted({name for rows in owned.values() for _, owner_names in rows for name in owner_names})
+    if not names:
+        return
+    genre = sa.table('genre', sa.column('id', sa.Integer), sa.column('name', sa.String))
+    op.bulk_insert(genre, [{'name': name} for name in names])
+    ids = dict(connection.execute(sa.select(genre.c.name, genre.c.id)).all())
+    for owner, table, column in OWNERS:
+        association = sa.table(table, sa.column('genre_id', sa.Integer), sa.column(column, sa.Integer))
+        rows = [{column: owner_id, 'genre_id': ids[name]}
+                for owner_id, owner_names in owned[owner] for name in owner_names]
+        if rows:
+            op.bulk_insert(association, rows)
+
+
+def downgrade():
+    for owner, table, column in OWNERS:
+        op.drop_index(f'ix_{table}_{column}', table_name=table)
+        op.drop_table(table)
+    op.drop_table('genre')
@@ -0,0 +1,64 @@
+"""search indexes for venue and artist names
+
+Revision ID: 92c7c4d28716
+Revises: 7c25cd0be818
+Create Date: 2026-10-18 09:12:41.208113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '92c7c4d28716'
+down_revision = '7c25cd0be818'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ('venue', 'artist')
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for table in TABLES:
+            op.execute(
+                f"ALTER TABLE {table} ADD COLUMN search_vector tsvector "
+                f"GENERATED ALWAYS AS (to_tsvector('simple', coalesce(name, ''))) STORED")
+            op.create_index(f'ix_{table}_search_vector', table, ['search_vector'],
+                            postgresql_using='gin')
+            op.create_index(f'ix_{table}_name_trgm', table, ['name'],
+                            postgresql_using='gin',
+                            postgresql_ops={'name': 'gin_trgm_ops'})
+    elif op.get_bind().dialect.name == 'sqlite':
+        for table in TABLES:
+            fts = table + '_fts'
+            op.execute(
+                f"CREATE VIRTUAL TABLE {fts} USING fts5("
+                f"name, content='{table}', content_rowid='id', tokenize='trigram')")
+            op.execute(
+                f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {fts}(rowid, name) VALUES (new.id, new.name); END")
+            op.execute(
+                f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, name) VALUES ('delete', old.id, old.name); END")
+            op.execute(
+                f"CREATE TRIGGER {fts}_au AFTER UPDATE OF name ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, name) VALUES ('delete', old.id, old.name); "
+                f"INSERT INTO {fts}(rowid, name) VALUES (new.id, new.name); END")
+            op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for table in TABLES:
+            op.drop_index(f'ix_{table}_name_trgm', table_name=table)
+            op.drop_index(f'ix_{table}_search_vector', table_name=table)
+            op.drop_column(table, 'search_vector')
+    elif op.get_bind().dialect.name == 'sqlite':
+        for table in TABLES:
+            fts = table + '_fts'
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute(f'DROP TRIGGER IF EXISTS {fts}_{suffix}')
+            op.execute(f'DROP TABLE IF EXISTS {fts}')
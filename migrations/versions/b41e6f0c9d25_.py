@@ -0,0 +1,60 @@
+"""precomputed area directory for /venues
+
+Revision ID: b41e6f0c9d25
+Revises: 6d70b7a32f7a
+Create Date: 2026-10-18 22:05:12.331904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b41e6f0c9d25'
+down_revision = '6d70b7a32f7a'
+branch_labels = None
+depends_on = None
+
+# venue_id is 0 for an area without venues, so every row has a full key for
+# REFRESH MATERIALIZED VIEW CONCURRENTLY
+POSTGRES_SELECT = """
+    SELECT area.id AS area_id, COALESCE(venue.id, 0) AS venue_id,
+           area.city, area.state, venue.name AS venue_name, venue.num_upcoming_shows,
+           GREATEST(area.updated_at, venue.updated_at) AS updated_at
+    FROM area LEFT OUTER JOIN venue ON venue.area_id = area.id
+"""
+
+SUMMARY_SELECT = """
+    SELECT area.id, COALESCE(venue.id, 0), area.city, area.state, venue.name,
+           venue.num_upcoming_shows,
+           MAX(COALESCE(area.updated_at, venue.updated_at),
+               COALESCE(venue.updated_at, area.updated_at))
+    FROM area LEFT OUTER JOIN venue ON venue.area_id = area.id
+"""
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(f'CREATE MATERIALIZED VIEW area_directory AS {POSTGRES_SELECT}')
+        op.execute('CREATE UNIQUE INDEX ux_area_directory ON area_directory (area_id, venue_id)')
+    else:
+        op.create_table(
+            'area_directory',
+            sa.Column('area_id', sa.Integer(), nullable=False),
+            sa.Column('venue_id', sa.Integer(), nullable=False),
+            sa.Column('city', sa.String(length=120), nullable=True),
+            sa.Column('state', sa.String(length=120), nullable=True),
+            sa.Column('venue_name', sa.String(), nullable=True),
+            sa.Column('num_upcoming_shows', sa.Integer(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('area_id', 'venue_id'),
+        )
+        op.execute(f'INSERT INTO area_directory {SUMMARY_SELECT}')
+    op.execute('CREATE INDEX ix_area_directory_updated_at ON area_directory (updated_at)')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('DROP MATERIALIZED VIEW area_directory')
+    else:
+        op.drop_table('area_directory')
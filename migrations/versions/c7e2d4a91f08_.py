@@ -0,0 +1,24 @@
+"""plain start_time index for streaming /shows in order
+
+Revision ID: c7e2d4a91f08
+Revises: 5a1c93e0b7d4
+Create Date: 2026-10-19 09:14:03.271650
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e2d4a91f08'
+down_revision = '5a1c93e0b7d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_show_start_time', 'show', ['start_time'])
+
+
+def downgrade():
+    op.drop_index('ix_show_start_time', table_name='show')
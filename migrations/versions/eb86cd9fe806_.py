@@ -0,0 +1,53 @@
+"""indexes for show lookups and unique area city/state
+
+Revision ID: eb86cd9fe806
+Revises: 92c7c4d28716
+Create Date: 2026-10-18 10:02:17.551904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'eb86cd9fe806'
+down_revision = '92c7c4d28716'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # fold duplicate areas into the lowest id before adding the constraint
+    for table in ('venue', 'artist'):
+        op.execute(f"""
+            UPDATE {table} SET area_id = (
+                SELECT MIN(a2.id) FROM area a1 JOIN area a2
+                  ON a1.city = a2.city AND a1.state = a2.state
+                WHERE a1.id = {table}.area_id)
+            WHERE area_id IN (
+                SELECT a1.id FROM area a1 JOIN area a2
+                  ON a1.city = a2.city AND a1.state = a2.state AND a2.id < a1.id)
+        """)
+    op.execute("""
+        DELETE FROM area WHERE id IN (
+            SELECT a1.id FROM area a1 JOIN area a2
+              ON a1.city = a2.city AND a1.state = a2.state AND a2.id < a1.id)
+    """)
+
+    with op.batch_alter_table('area') as batch_op:
+        batch_op.create_unique_constraint('uq_area_city_state', ['city', 'state'])
+    op.create_index('ix_venue_area_id', 'venue', ['area_id'])
+    op.create_index('ix_artist_area_id', 'artist', ['area_id'])
+    op.create_index('ix_show_venue_id_start_time', 'show', ['venue_id', 'start_time'],
+                    postgresql_include=['artist_id'])
+    op.create_index('ix_show_artist_id_start_time', 'show', ['artist_id', 'start_time'],
+                    postgresql_include=['venue_id'])
+
+
+def downgrade():
+    op.drop_index('ix_show_artist_id_start_time', table_name='show')
+    op.drop_index('ix_show_venue_id_start_time', table_name='show')
+    op.drop_index('ix_artist_area_id', table_name='artist')
+    op.drop_index('ix_venue_area_id', table_name='venue')
+    with op.batch_alter_table('area') as batch_op:
+        batch_op.drop_constraint('uq_area_city_state', type_='unique')
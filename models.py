@@ -1,4 +1,6 @@
 
+from datetime import datetime
+
 from flask import Flask
 from flask_moment import Moment
 from flask_sqlalchemy import SQLAlchemy
@@ -12,15 +14,20 @@ db = SQLAlchemy()
 
 class Area(db.Model):
     __tablename__ = 'area'
+    __table_args__ = (
+        db.UniqueConstraint('city', 'state', name='uq_area_city_state'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     venues = db.relationship('Venue', backref='list', lazy=True)
     artists = db.relationship('Artist', backref='list', lazy=True)
 
     def __repr__(self):
-        return f'<Area ID: {self.id}, city: {self.city}, state: {self.state}, venues: {self.venues}>'
+        # no relationships here: logging an area must not lazy-load its venues
+        return f'<Area ID: {self.id}, city: {self.city}, state: {self.state}>'
 
 class Venue(db.Model):
     __tablename__ = 'venue'
@@ -32,11 +39,12 @@ class Venue(db.Model):
     genres = db.Column(db.String(500))
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
-    num_upcoming_shows = db.Column(db.Integer)
+    num_upcoming_shows = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     seeking_talent = db.Column(db.Boolean)
     website = db.Column(db.String(120))
     seeking_description = db.Column(db.String(500))
-    area_id = db.Column(db.Integer, db.ForeignKey('area.id'), nullable=False)
+    area_id = db.Column(db.Integer, db.ForeignKey('area.id'), nullable=False, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     shows = db.relationship('Show', backref='venue', lazy=True)
 
     def __repr__(self):
@@ -51,15 +59,61 @@ class Artist(db.Model):
     genres = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
-    area_id = db.Column(db.Integer, db.ForeignKey('area.id'), nullable=True)
+    num_upcoming_shows = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    area_id = db.Column(db.Integer, db.ForeignKey('area.id'), nullable=True, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     shows = db.relationship('Show', backref='artist', lazy=True)
 
     def __repr__(self):
         return f'<Artist ID: {self.id}, name: {self.name}, phone: {self.phone}, genres: {self.genres}, image_link: {self.image_link}, facebook_link: {self.facebook_link}, area_id: {self.area_id}>'
 
 
+class Genre(db.Model):
+    __tablename__ = 'genre'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+    def __repr__(self):
+        return f'<Genre ID: {self.id}, name: {self.name}>'
+
+
+# Venue/Artist.genres stays the display string; these index it for filtering
+# and are kept in step with it by genres.py. Keyed (genre_id, owner) so a genre
+# filter reads only its own slice.
+venue_genre = db.Table(
+    'venue_genre',
+    db.Column('genre_id', db.Integer, db.ForeignKey('genre.id'), primary_key=True),
+    db.Column('venue_id', db.Integer, db.ForeignKey('venue.id', ondelete='CASCADE'),
+              primary_key=True, index=True),
+)
+
+artist_genre = db.Table(
+    'artist_genre',
+    db.Column('genre_id', db.Integer, db.ForeignKey('genre.id'), primary_key=True),
+    db.Column('artist_id', db.Integer, db.ForeignKey('artist.id', ondelete='CASCADE'),
+              primary_key=True, index=True),
+)
+
+
 class Show(db.Model):
     __tablename__ = 'show'
+    # every page reads shows by venue or artist and splits on start_time;
+    # on Postgres the other foreign key is carried in the index as well
+    __table_args__ = (
+        db.Index('ix_show_venue_id_start_time', 'venue_id', 'start_time',
+                 postgresql_include=['artist_id']),
+        db.Index('ix_show_artist_id_start_time', 'artist_id', 'start_time',
+                 postgresql_include=['venue_id']),
+        # /shows streams every show in start order; without this the whole
+        # table is sorted before the first row goes out
+        db.Index('ix_show_start_time', 'start_time'),
+        # partial, so it only competes for the rollover scan and never for
+        # the per-venue/per-artist lookups above
+        db.Index('ix_show_upcoming_start_time', 'start_time',
+                 postgresql_where=db.text('upcoming'),
+                 sqlite_where=db.text('upcoming = 1')),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120))
@@ -68,3 +122,8 @@ class Show(db.Model):
     artist_id = db.Column(db.Integer, db.ForeignKey(
             'artist.id'), nullable=False)
     start_time =  db.Column(db.DateTime)
+    # the show takes [start_time, end_time); overlaps are rejected, see bookings.py
+    end_time = db.Column(db.DateTime)
+    # still counted in Venue/Artist.num_upcoming_shows, see counters.py
+    upcoming = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,174 @@
+import os
+import threading
+import time
+import weakref
+
+from flask import current_app, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import NullPool, QueuePool
+
+# ----------------------------------------------------------------------------#
+# Connection pool.
+#
+# engine_options() turns the DB_* settings in config.py into
+# SQLALCHEMY_ENGINE_OPTIONS. DB_POOL_MODE picks one of:
+#   session      the app keeps its own pool (QueuePool); the statement timeout
+#                is set on a connection when it is checked out for a request
+#                and stays there until the connection is used outside one
+#   transaction  for running behind a transaction-pooling bouncer (pgbouncer
+#                pool_mode=transaction): no app-side pool, and the timeout is
+#                set with SET LOCAL in every request's transactions, since
+#                session state doesn't survive the bouncer handing the server
+#                to someone else
+#
+# DB_STATEMENT_TIMEOUT_MS only bounds web requests. Migrations, imports, the
+# directory refresh and other CLI jobs share the engine but run without it.
+# ----------------------------------------------------------------------------#
+
+
+class TimedQueuePool(QueuePool):
+    # QueuePool that records how long checkouts wait for a free connection
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+    def recreate(self):
+        # keep the counters across dispose()
+        pool = super().recreate()
+        pool.checkouts, pool.timeouts = self.checkouts, self.timeouts
+        pool.wait_total, pool.wait_max = self.wait_total, self.wait_max
+        return pool
+
+
+def engine_options(config):
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() != 'postgresql':
+        return options
+
+    if config.get('DB_POOL_MODE', 'session') == 'transaction':
+        # every checkout is a fresh connection, so there is nothing to ping
+        options.setdefault('poolclass', NullPool)
+        return options
+
+    options.setdefault('poolclass', TimedQueuePool)
+    options.setdefault('pool_pre_ping', config.get('DB_POOL_PRE_PING', True))
+    options.setdefault('pool_size', config.get('DB_POOL_SIZE', 10))
+    options.setdefault('max_overflow', config.get('DB_MAX_OVERFLOW', 10))
+    options.setdefault('pool_timeout', config.get('DB_POOL_TIMEOUT', 30))
+    options.setdefault('pool_recycle', config.get('DB_POOL_RECYCLE', 1800))
+    return options
+
+
+def statement_timeout(config, mode):
+    # the timeout DB_POOL_MODE `mode` applies to web requests, if any
+    if config.get('DB_POOL_MODE', 'session') != mode:
+        return None
+    return config.get('DB_STATEMENT_TIMEOUT_MS') or None
+
+
+def request_timeout(mode):
+    if not has_request_context():
+        return None
+    return statement_timeout(current_app.config, mode)
+
+
+def set_connection_timeout(dbapi_connection, connection_record, connection_proxy):
+    # session mode: SET is only sent when a connection moves between request
+    # and non-request work, and committed so the caller's transaction starts
+    # clean (SET is transactional on Postgres)
+    timeout = request_timeout('session')
+    if connection_record.info.get('statement_timeout') == timeout:
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f'SET statement_timeout = {int(timeout)}' if timeout
+                   else 'SET statement_timeout = DEFAULT')
+    cursor.close()
+    dbapi_connection.commit()
+    connection_record.info['statement_timeout'] = timeout
+
+
+def set_statement_timeout(session, transaction, connection):
+    # transaction mode
+    if connection.dialect.name != 'postgresql':
+        return
+    timeout = request_timeout('transaction')
+    if timeout:
+        connection.exec_driver_sql(f'SET LOCAL statement_timeout = {int(timeout)}')
+
+
+def init_app(app, db):
+    # call before db.init_app(app)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+
+    # pool and session events are global, so only attach them once per
+    # process; the listeners read the timeout from whichever app is current
+    if statement_timeout(app.config, 'session') and not event.contains(
+            TimedQueuePool, 'checkout', set_connection_timeout):
+        event.listen(TimedQueuePool, 'checkout', set_connection_timeout)
+    if statement_timeout(app.config, 'transaction') and not event.contains(
+            db.session, 'after_begin', set_statement_timeout):
+        event.listen(db.session, 'after_begin', set_statement_timeout)
+
+
+def pool_stats(engine):
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+        })
+    if isinstance(pool, TimedQueuePool):
+        stats["wait"] = {
+            "checkouts": pool.checkouts,
+            "timeouts": pool.timeouts,
+            "total_seconds": round(pool.wait_total, 6),
+            "mean_ms": round(pool.wait_total / pool.checkouts * 1000, 3) if pool.checkouts else 0.0,
+            "max_ms": round(pool.wait_max * 1000, 3),
+        }
+    return stats
+
+
+def dispose_after_fork(app, db):
+    # with gunicorn --preload the app, and possibly a connection or two, exist
+    # before the workers fork; each child drops the pool it inherited so no two
+    # processes share a socket, without closing the parent's connections
+    if not hasattr(os, 'register_at_fork'):
+        return
+    app_ref = weakref.ref(app)
+
+    def reset_pool():
+        app = app_ref()
+        if app is None:
+            return
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+
+    os.register_at_fork(after_in_child=reset_pool)
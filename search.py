@@ -0,0 +1,85 @@
+from models import db
+
+# ----------------------------------------------------------------------------#
+# Search.
+#
+# Postgres: a generated tsvector column with a GIN index ranks word matches and
+# a pg_trgm GIN index serves the substring (ILIKE) matches. Both are created by
+# migration 92c7c4d28716.
+#
+# SQLite: an external-content FTS5 table per searchable table, using the
+# trigram tokenizer so substring matches go through the index too. Triggers
+# keep it in sync with the base table.
+# ----------------------------------------------------------------------------#
+
+SEARCHABLE_TABLES = ('venue', 'artist')
+
+# the trigram tokenizer can't match anything shorter than this
+FTS_MIN_TERM_LENGTH = 3
+
+
+def sqlite_fts_ddl(table):
+    fts = table + '_fts'
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"name, content='{table}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, name) VALUES (new.id, new.name); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, name) VALUES ('delete', old.id, old.name); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF name ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, name) VALUES ('delete', old.id, old.name); "
+        f"INSERT INTO {fts}(rowid, name) VALUES (new.id, new.name); END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def create_search_index(engine):
+    # Postgres gets its indexes from the migration; this covers SQLite
+    # databases built with db.create_all()
+    if engine.dialect.name != 'sqlite':
+        return
+    with engine.begin() as connection:
+        for table in SEARCHABLE_TABLES:
+            for statement in sqlite_fts_ddl(table):
+                connection.exec_driver_sql(statement)
+
+
+def _like_pattern(term):
+    escaped = term.replace('/', '//').replace('%', '/%').replace('_', '/_')
+    return '%' + escaped + '%'
+
+
+def search(model, term):
+    # returns a query of (id, name, num_upcoming_shows) rows for model,
+    # best matches first
+    term = term.strip()
+    query = db.session.query(model.id, model.name, model.num_upcoming_shows)
+    if not term:
+        return query.order_by(model.id)
+
+    dialect = db.session.get_bind().dialect.name
+    table = model.__tablename__
+
+    if dialect == 'postgresql':
+        vector = db.literal_column(table + '.search_vector')
+        tsquery = db.func.plainto_tsquery('simple', term)
+        return query.filter(db.or_(
+            vector.op('@@')(tsquery),
+            model.name.ilike(_like_pattern(term), escape='/')
+        )).order_by(
+            db.func.ts_rank(vector, tsquery).desc(),
+            db.func.similarity(model.name, term).desc(),
+            model.id
+        )
+
+    if dialect == 'sqlite' and len(term) >= FTS_MIN_TERM_LENGTH:
+        fts = db.table(table + '_fts', db.column('rowid'), db.column('rank'))
+        phrase = '"' + term.replace('"', '""') + '"'
+        return query.join(fts, fts.c.rowid == model.id).filter(
+            db.literal_column(table + '_fts').op('MATCH')(phrase)
+        ).order_by(fts.c.rank, model.id)
+
+    return query.filter(
+        model.name.ilike(_like_pattern(term), escape='/')
+    ).order_by(model.name, model.id)
@@ -0,0 +1,114 @@
+import random
+from datetime import datetime, timedelta
+
+from models import db, Venue, Artist
+import importer
+
+# ----------------------------------------------------------------------------#
+# Synthetic dataset.
+#
+# Generates areas, venues, artists and shows at a given scale from a fixed
+# random seed, so two runs with the same arguments produce the same catalog.
+# Rows go through the bulk importer, i.e. COPY on Postgres and executemany on
+# SQLite, into whatever database SQLALCHEMY_DATABASE_URI points at.
+# ----------------------------------------------------------------------------#
+
+STATES = ['CA', 'NY', 'TX', 'WA', 'IL', 'MA', 'OR', 'CO', 'GA', 'FL']
+GENRES = ['Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk', 'Funk',
+          'Hip-Hop', 'Heavy Metal', 'Instrumental', 'Jazz', 'Musical Theatre', 'Pop',
+          'Punk', 'R&B', 'Reggae', 'Rock n Roll', 'Soul', 'Other']
+WORDS = ['Blue', 'Red', 'Golden', 'Velvet', 'Electric', 'Midnight', 'Silver', 'Lucky',
+         'Wild', 'Neon', 'Crystal', 'Howling', 'Broken', 'Rusty', 'Bright', 'Quiet']
+VENUE_KINDS = ['Hall', 'Lounge', 'Club', 'Room', 'Theatre', 'Bar', 'Garage', 'Arena']
+ARTIST_KINDS = ['Band', 'Trio', 'Collective', 'Orchestra', 'Quartet', 'Project', 'Crew']
+
+# per-show ratios used to size the other tables
+SHOWS_PER_VENUE = 50
+SHOWS_PER_ARTIST = 20
+VENUES_PER_AREA = 10
+
+# seeded shows start on this grid and last bookings.DEFAULT_DURATION
+SHOW_SLOT_MINUTES = 180
+
+
+def scale(shows):
+    venues = max(shows // SHOWS_PER_VENUE, 10)
+    artists = max(shows // SHOWS_PER_ARTIST, 10)
+    areas = max(venues // VENUES_PER_AREA, 1)
+    return {"areas": areas, "venues": venues, "artists": artists, "shows": shows}
+
+
+def _name(rng, kinds, index):
+    return f'{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.choice(kinds)} {index}'
+
+
+def _genres(rng):
+    return ','.join(rng.sample(GENRES, rng.randint(1, 3)))
+
+
+def venue_rows(rng, count, areas):
+    for index in range(count):
+        city, state = areas[rng.randrange(len(areas))]
+        yield {
+            'name': _name(rng, VENUE_KINDS, index),
+            'city': city,
+            'state': state,
+            'address': f'{rng.randint(1, 9999)} {rng.choice(WORDS)} St',
+            'phone': f'{rng.randint(200, 999)}-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}',
+            'genres': _genres(rng),
+            'website': f'https://venue{index}.example.com',
+            'seeking_talent': rng.random() < 0.3,
+            'seeking_description': 'Looking for local acts' if rng.random() < 0.3 else '',
+        }
+
+
+def artist_rows(rng, count, areas):
+    for index in range(count):
+        city, state = areas[rng.randrange(len(areas))]
+        yield {
+            'name': _name(rng, ARTIST_KINDS, index),
+            'city': city,
+            'state': state,
+            'phone': f'{rng.randint(200, 999)}-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}',
+            'genres': _genres(rng),
+        }
+
+
+def show_rows(rng, count, venue_ids, artist_ids, now):
+    # spread over two years back and one year ahead, on the slot grid so no
+    # venue or artist is ever booked for two shows at once
+    slots = range(-2 * 525600 // SHOW_SLOT_MINUTES, 525600 // SHOW_SLOT_MINUTES)
+    venue_slots = set()
+    artist_slots = set()
+    for _ in range(count):
+        while True:
+            venue_id = venue_ids[rng.randrange(len(venue_ids))]
+            artist_id = artist_ids[rng.randrange(len(artist_ids))]
+            slot = slots[rng.randrange(len(slots))]
+            if (venue_id, slot) not in venue_slots and (artist_id, slot) not in artist_slots:
+                break
+        venue_slots.add((venue_id, slot))
+        artist_slots.add((artist_id, slot))
+        yield {
+            'venue_id': venue_id,
+            'artist_id': artist_id,
+            'start_time': (now + timedelta(minutes=slot * SHOW_SLOT_MINUTES)).isoformat(),
+        }
+
+
+def seed(shows, random_seed=42, batch_size=5000, report=print):
+    rng = random.Random(random_seed)
+    sizes = scale(shows)
+    report(f'seeding {sizes}')
+    areas = [(f'City {index}', STATES[index % len(STATES)]) for index in range(sizes['areas'])]
+    now = datetime.now().replace(second=0, microsecond=0)
+
+    first_venue = (db.session.query(db.func.max(Venue.id)).scalar() or 0) + 1
+    first_artist = (db.session.query(db.func.max(Artist.id)).scalar() or 0) + 1
+    importer.import_rows('venues', venue_rows(rng, sizes['venues'], areas), batch_size, report)
+    importer.import_rows('artists', artist_rows(rng, sizes['artists'], areas), batch_size, report)
+
+    venue_ids = [id for id, in db.session.query(Venue.id).filter(Venue.id >= first_venue)]
+    artist_ids = [id for id, in db.session.query(Artist.id).filter(Artist.id >= first_artist)]
+    importer.import_rows('shows', show_rows(rng, shows, venue_ids, artist_ids, now), batch_size, report)
+    return sizes
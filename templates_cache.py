@@ -0,0 +1,52 @@
+import os
+
+from jinja2 import FileSystemBytecodeCache
+
+# ----------------------------------------------------------------------------#
+# Jinja bytecode cache.
+#
+# Off unless TEMPLATE_CACHE_DIR is set. Compiled templates are then written
+# there and every worker loads the bytecode instead of parsing and compiling
+# the source on first use. Entries are checked against the source checksum, so an edited
+# template is simply recompiled. `flask compile-templates` fills the cache
+# for the whole templates/ tree ahead of time (e.g. in the image build), so
+# even the first request on a fresh worker skips compilation.
+# ----------------------------------------------------------------------------#
+
+TEMPLATE_EXTENSIONS = ('.html',)
+
+
+class BestEffortBytecodeCache(FileSystemBytecodeCache):
+    # a cache baked into a read-only image is still read from; an entry that
+    # can't be written is skipped instead of failing the render
+
+    def dump_bytecode(self, bucket):
+        try:
+            super().dump_bytecode(bucket)
+        except OSError:
+            pass
+
+
+def init_app(app):
+    directory = app.config.get('TEMPLATE_CACHE_DIR')
+    if not directory:
+        return
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError as error:
+        app.logger.warning('template bytecode cache disabled: %s', error)
+        return
+    app.jinja_env.bytecode_cache = BestEffortBytecodeCache(directory)
+
+
+def writable(app):
+    directory = app.config.get('TEMPLATE_CACHE_DIR')
+    return bool(directory) and os.access(directory, os.W_OK)
+
+
+def compile_templates(app):
+    # compiling through get_template() writes each one to the bytecode cache
+    names = app.jinja_env.list_templates(extensions=[ext.lstrip('.') for ext in TEMPLATE_EXTENSIONS])
+    for name in names:
+        app.jinja_env.get_template(name)
+    return names
@@ -0,0 +1,17 @@
+import pytest
+
+import seed
+
+
+@pytest.mark.parametrize('fields', ['', ',', ' , '])
+def test_empty_field_list_is_rejected(client, fields):
+    seed.seed(20, report=lambda message: None)
+    for path in ('/api/v1/venues', '/api/v1/artists/1', '/api/v1/shows'):
+        assert client.get(path, query_string={'fields': fields}).status_code == 400
+
+
+def test_fields_select_columns(client):
+    seed.seed(20, report=lambda message: None)
+    rows = client.get('/api/v1/venues?fields=name&limit=3').get_json()['data']
+    assert len(rows) == 3 and all(set(row) == {'name'} for row in rows)
+    assert {'id', 'name', 'city'} <= set(client.get('/api/v1/venues?limit=1').get_json()['data'][0])
@@ -0,0 +1,34 @@
+import areas
+from models import db, Area
+
+
+def test_existing_area_is_read_not_inserted(app, statements):
+    area = Area(city='San Francisco', state='CA')
+    db.session.add(area)
+    db.session.commit()
+    expected = area.id
+    del statements[:]
+    area_id = areas.resolve_area_id('San Francisco', 'CA')
+    assert area_id == expected
+    assert [statement.split()[0] for statement in statements] == ['SELECT']
+    # cached from then on
+    del statements[:]
+    assert areas.resolve_area_id('San Francisco', 'CA') == area_id
+    assert statements == []
+
+
+def test_new_area_is_created_once(app):
+    first = areas.resolve_area_id('Portland', 'OR')
+    second = areas.resolve_area_id('Portland', 'OR')
+    db.session.commit()
+    assert first == second
+    assert Area.query.filter_by(city='Portland', state='OR').count() == 1
+
+
+def test_batch_resolves_existing_and_new_areas(app):
+    existing = areas.resolve_area_id('Austin', 'TX')
+    db.session.commit()
+    ids = areas.resolve_area_ids([('Austin', 'TX'), ('Boston', 'MA')])
+    db.session.commit()
+    assert ids[('Austin', 'TX')] == existing
+    assert ids[('Boston', 'MA')] == Area.query.filter_by(city='Boston').one().id
@@ -0,0 +1,95 @@
+import asyncio
+import re
+
+import pytest
+
+import asgi
+import seed
+
+# The async read path must answer conditional requests exactly like the Flask
+# views it stands in for.
+
+
+async def call(read_app, path, headers=()):
+    path, _, query = path.partition('?')
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': query.encode(),
+             'headers': [(name.lower().encode(), value.encode()) for name, value in headers]}
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        sent.append(message)
+    await read_app(scope, receive, send)
+    headers = {name.decode(): value.decode() for name, value in sent[0]['headers']}
+    return sent[0]['status'], headers, b''.join(message.get('body', b'') for message in sent[1:])
+
+
+@pytest.mark.parametrize('path', ['/venues?genre=Jazz', '/artists', '/venues/1', '/artists/1'])
+def test_read_pages_honour_validators(app, client, path):
+    seed.seed(50, report=lambda message: None)
+    expected = client.get(path)
+    read_app = asgi.create_asgi_app(app)
+
+    async def requests():
+        try:
+            fresh = await call(read_app, path)
+            revalidated = await call(read_app, path, [('If-None-Match', fresh[1]['etag'])])
+            stale = await call(read_app, path, [('If-None-Match', 'W/"stale"')])
+            return fresh, revalidated, stale
+        finally:
+            await read_app.engine.dispose()
+    fresh, revalidated, stale = asyncio.run(requests())
+
+    assert fresh[0] == 200
+    assert fresh[1]['etag'] == expected.headers['ETag']
+    assert revalidated[0] == 304 and revalidated[2] == b''
+    assert stale[0] == 200 and stale[2]
+
+
+def run(app, *requests):
+    read_app = asgi.create_asgi_app(app)
+
+    async def calls():
+        try:
+            return [await call(read_app, *request) for request in requests]
+        finally:
+            if read_app.engine is not None:
+                await read_app.engine.dispose()
+    return asyncio.run(calls())
+
+
+def queries(response):
+    return int(re.search(r'desc="(\d+) queries"', response[1]['server-timing']).group(1))
+
+
+def test_server_timing_counts_async_statements(app):
+    seed.seed(50, report=lambda message: None)
+    fresh, = run(app, ('/venues/1',))
+    revalidated, = run(app, ('/venues/1', [('If-None-Match', fresh[1]['etag'])]))
+
+    # the validators, then the venue, its area, past and upcoming shows
+    assert fresh[0] == 200 and queries(fresh) == 5
+    assert revalidated[0] == 304 and queries(revalidated) == 1
+
+
+def test_missing_page_uses_the_404_handler(app, client):
+    response, = run(app, ('/venues/99999',))
+
+    assert response[0] == 404
+    assert response[2] == client.get('/venues/99999').data
+
+
+def test_errors_use_the_500_handler(app, monkeypatch):
+    async def broken(engine, args):
+        raise RuntimeError('boom')
+    pattern, handler, validators = asgi.ROUTES[1]
+    monkeypatch.setattr(asgi, 'ROUTES', [(pattern, broken, validators)])
+    app.config['PROPAGATE_EXCEPTIONS'] = False
+
+    response, = run(app, ('/artists',))
+
+    assert response[0] == 500
+    assert b'Something went wrong' in response[2]
+    assert 'server-timing' in response[1]
@@ -0,0 +1,46 @@
+import logging
+
+import app as views
+from models import db, Area, Venue, Artist
+
+VENUE = {'name': 'The Blue Note', 'city': 'San Francisco', 'state': 'CA', 'address': '1 Main St',
+         'phone': '326-123-5000', 'genres': 'Jazz,Blues', 'facebook_link': 'https://facebook.com/x',
+         'image_link': 'https://example.com/a.png'}
+ARTIST = {'name': 'Quiet Trio', 'city': 'Portland', 'state': 'OR', 'phone': '326-123-5000',
+          'genres': ['Jazz'], 'facebook_link': 'https://facebook.com/x',
+          'image_link': 'https://example.com/a.png'}
+
+
+def test_results_per_item_with_partial_failure(client):
+    items = [VENUE, dict(VENUE, name=''), 5, dict(VENUE, name='Red Room', city='Austin', state='TX')]
+    response = client.post('/venues/create', json=items)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body['created'], body['failed']) == (2, 2)
+    results = body['results']
+    assert [result['index'] for result in results] == [0, 1, 2, 3]
+    assert [result['success'] for result in results] == [True, False, False, True]
+    assert 'name' in results[1]['errors']
+    assert results[2]['errors'] == {'item': ['must be an object']}
+    assert db.session.get(Venue, results[0]['id']).name == 'The Blue Note'
+    assert db.session.get(Venue, results[3]['id']).name == 'Red Room'
+    assert Venue.query.count() == 2
+    assert {(area.city, area.state) for area in Area.query} == {('San Francisco', 'CA'), ('Austin', 'TX')}
+
+
+def test_artist_batch(client):
+    body = client.post('/artists/create', json=[ARTIST, dict(ARTIST, name='Neon Band')]).get_json()
+    assert body['created'] == 2 and body['failed'] == 0
+    assert sorted(artist.name for artist in Artist.query) == ['Neon Band', 'Quiet Trio']
+
+
+def test_database_error_rolls_back_and_is_logged(app, client, monkeypatch, caplog):
+    def fail(keys):
+        raise RuntimeError('database went away')
+    monkeypatch.setattr(views, 'resolve_area_ids', fail)
+    with caplog.at_level(logging.ERROR):
+        response = client.post('/venues/create', json=[VENUE, dict(VENUE, name='Red Room')])
+    assert response.status_code == 500
+    assert Venue.query.count() == 0
+    record, = [record for record in caplog.records if record.message == 'batch create failed']
+    assert 'database went away' in str(record.exc_info[1])
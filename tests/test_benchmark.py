@@ -0,0 +1,19 @@
+import benchmark
+import seed
+from cache import LRUCache
+from models import db, Area, Venue, Artist, Show
+
+
+def counts():
+    return [model.query.count() for model in (Area, Venue, Artist, Show)]
+
+
+def test_run_leaves_the_dataset_unchanged(app):
+    seed.seed(50, report=lambda message: None)
+    db.session.commit()
+    before = counts()
+    results = benchmark.run(app, LRUCache(), iterations=3, report=lambda message: None)
+    assert all(result['errors'] == 0 for result in results.values())
+    db.session.remove()
+    assert counts() == before
+    assert Venue.query.filter_by(name=benchmark.CREATE_VENUE['name']).count() == 0
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import bookings
+from models import db, Area, Venue, Artist, Show
+
+START = datetime(2031, 3, 1, 20, 0)
+
+
+@pytest.fixture
+def owners(app):
+    area = Area(city='San Francisco', state='CA')
+    db.session.add(area)
+    db.session.flush()
+    rows = [Venue(name='The Blue Note', area_id=area.id, num_upcoming_shows=0),
+            Venue(name='Red Room', area_id=area.id, num_upcoming_shows=0),
+            Artist(name='Quiet Trio', area_id=area.id, num_upcoming_shows=0),
+            Artist(name='Neon Band', area_id=area.id, num_upcoming_shows=0)]
+    db.session.add_all(rows)
+    db.session.commit()
+    return [row.id for row in rows]
+
+
+def book(client, venue_id, artist_id, start, minutes=120):
+    return client.post('/shows/create', data={
+        'venue_id': venue_id, 'artist_id': artist_id,
+        'start_time': start.strftime('%Y-%m-%d %H:%M'), 'duration': minutes})
+
+
+def test_double_booking_is_rejected(client, owners):
+    blue_note, red_room, trio, band = owners
+    assert book(client, blue_note, trio, START).status_code == 200
+    # same venue, another artist, overlapping the last hour
+    response = book(client, blue_note, band, START + timedelta(hours=1))
+    assert response.status_code == 409
+    assert b'The venue is already booked' in response.data
+    # same artist at another venue, starting earlier and running into it
+    response = book(client, red_room, trio, START - timedelta(hours=1))
+    assert response.status_code == 409
+    assert b'The artist is already booked' in response.data
+    assert Show.query.count() == 1
+
+
+def test_touching_shows_do_not_overlap(client, owners):
+    blue_note, red_room, trio, band = owners
+    assert book(client, blue_note, trio, START, minutes=90).status_code == 200
+    assert book(client, blue_note, band, START + timedelta(minutes=90)).status_code == 200
+    assert book(client, blue_note, band, START - timedelta(minutes=30), minutes=30).status_code == 200
+    assert Show.query.count() == 3
+
+
+@pytest.mark.parametrize('minutes', [0, bookings.MAX_DURATION // timedelta(minutes=1) + 1])
+def test_duration_out_of_range_is_rejected(client, owners, minutes):
+    blue_note, red_room, trio, band = owners
+    assert book(client, blue_note, trio, START, minutes).status_code == 400
+    assert Show.query.count() == 0
+
+
+def availability(client, venue_id, start, end, **args):
+    return client.get(f'/api/v1/venues/{venue_id}/availability',
+                      query_string={'start': start, 'end': end, **args})
+
+
+def test_availability_lists_free_slots(client, owners):
+    blue_note, red_room, trio, band = owners
+    book(client, blue_note, trio, START)
+    book(client, blue_note, band, START + timedelta(hours=3))
+    response = availability(client, blue_note, '2031-03-01T18:00', '2031-03-02T00:00')
+    assert response.status_code == 200
+    assert response.get_json()['free'] == [
+        {'start': '2031-03-01T18:00:00', 'end': '2031-03-01T20:00:00'},
+        {'start': '2031-03-01T22:00:00', 'end': '2031-03-01T23:00:00'},
+    ]
+    # the hour between the shows is too short
+    response = availability(client, blue_note, '2031-03-01T18:00', '2031-03-02T00:00',
+                            min_minutes=90)
+    assert response.get_json()['free'] == [
+        {'start': '2031-03-01T18:00:00', 'end': '2031-03-01T20:00:00'}]
+    response = availability(client, red_room, '2031-03-01T18:00', '2031-03-02T00:00')
+    assert response.get_json()['free'] == [
+        {'start': '2031-03-01T18:00:00', 'end': '2031-03-02T00:00:00'}]
+
+
+@pytest.mark.parametrize('start, end', [
+    ('2031-03-02', '2031-03-01'),
+    ('2031-03-01', '2033-03-01'),
+    ('2031-03-01T00:00Z', '2031-03-02T00:00Z'),
+    ('tomorrow', '2031-03-02'),
+])
+def test_availability_rejects_bad_ranges(client, owners, start, end):
+    assert availability(client, owners[0], start, end).status_code == 400
+
+
+def test_availability_of_unknown_venue(client, owners):
+    assert availability(client, 999, '2031-03-01', '2031-03-02').status_code == 404
@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+import pytest
+from werkzeug.http import http_date
+
+import seed
+from models import db, Artist
+
+# The Flask views answer conditional requests themselves; test_asgi.py checks
+# the async read path gives the same answers.
+
+PAGES = ['/venues?genre=Jazz', '/artists', '/venues/1', '/artists/1']
+
+
+@pytest.fixture
+def seeded(app):
+    seed.seed(50, report=lambda message: None)
+
+
+@pytest.mark.parametrize('path', PAGES)
+def test_if_none_match(client, seeded, path):
+    fresh = client.get(path)
+    assert fresh.status_code == 200 and fresh.headers['ETag'].startswith('W/')
+    assert fresh.headers['Cache-Control'] == 'no-cache'
+    revalidated = client.get(path, headers={'If-None-Match': fresh.headers['ETag']})
+    assert revalidated.status_code == 304 and revalidated.data == b''
+    assert revalidated.headers['ETag'] == fresh.headers['ETag']
+    assert client.get(path, headers={'If-None-Match': 'W/"stale"'}).status_code == 200
+
+
+@pytest.mark.parametrize('path', PAGES)
+def test_if_modified_since(client, seeded, path):
+    last_modified = client.get(path).last_modified
+    assert client.get(path, headers={'If-Modified-Since': http_date(last_modified)}).status_code == 304
+    earlier = last_modified - timedelta(seconds=1)
+    assert client.get(path, headers={'If-Modified-Since': http_date(earlier)}).status_code == 200
+
+
+def test_edit_changes_the_etag(client, seeded):
+    etag = client.get('/artists/1').headers['ETag']
+    db.session.get(Artist, 1).name = 'Renamed Band'
+    db.session.commit()
+    response = client.get('/artists/1', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag and b'Renamed Band' in response.data
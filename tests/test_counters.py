@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+import counters
+from models import db, Area, Venue, Artist, Show
+
+NOW = datetime(2030, 6, 1, 20, 0)
+
+
+def make_owners():
+    area = Area(city='San Francisco', state='CA')
+    db.session.add(area)
+    db.session.flush()
+    venue = Venue(name='The Blue Note', area_id=area.id, num_upcoming_shows=0)
+    artist = Artist(name='Red Room Band', area_id=area.id, num_upcoming_shows=0)
+    db.session.add_all([venue, artist])
+    db.session.commit()
+    return venue, artist
+
+
+def add_show(venue, artist, start_time):
+    show = Show(venue_id=venue.id, artist_id=artist.id, start_time=start_time)
+    db.session.add(show)
+    counters.show_added(show, NOW)
+    db.session.commit()
+    return show
+
+
+def upcoming_counts(venue, artist):
+    db.session.expire_all()
+    return venue.num_upcoming_shows, artist.num_upcoming_shows
+
+
+def test_added_shows_count_when_upcoming(app):
+    venue, artist = make_owners()
+    past = add_show(venue, artist, NOW - timedelta(days=1))
+    future = add_show(venue, artist, NOW + timedelta(days=1))
+    assert (past.upcoming, future.upcoming) == (False, True)
+    assert upcoming_counts(venue, artist) == (1, 1)
+
+
+def test_show_without_start_time_is_not_upcoming(app):
+    venue, artist = make_owners()
+    show = add_show(venue, artist, None)
+    assert show.upcoming is False
+    assert upcoming_counts(venue, artist) == (0, 0)
+
+
+def test_deleting_shows_takes_them_off_the_counters(app):
+    venue, artist = make_owners()
+    add_show(venue, artist, NOW - timedelta(days=1))
+    future = add_show(venue, artist, NOW + timedelta(days=1))
+    add_show(venue, artist, NOW + timedelta(days=2))
+    counters.delete_shows(Show.id == future.id)
+    db.session.commit()
+    assert upcoming_counts(venue, artist) == (1, 1)
+    counters.delete_shows(Show.venue_id == venue.id)
+    db.session.commit()
+    assert upcoming_counts(venue, artist) == (0, 0)
+
+
+def test_rollover_moves_started_shows_to_past(app):
+    venue, artist = make_owners()
+    soon = add_show(venue, artist, NOW + timedelta(hours=1))
+    add_show(venue, artist, NOW + timedelta(days=2))
+    assert counters.rollover_shows(NOW + timedelta(hours=2)) == 1
+    assert upcoming_counts(venue, artist) == (1, 1)
+    assert db.session.get(Show, soon.id).upcoming is False
+    assert counters.rollover_shows(NOW + timedelta(hours=2)) == 0
+
+
+def test_recount_rebuilds_flags_and_counters(app):
+    venue, artist = make_owners()
+    add_show(venue, artist, NOW + timedelta(days=1))
+    add_show(venue, artist, NOW + timedelta(days=2))
+    add_show(venue, artist, None)
+    # drifted counters, e.g. after a bulk load
+    venue.num_upcoming_shows = 7
+    artist.num_upcoming_shows = 0
+    db.session.commit()
+    counters.recount_upcoming_shows(NOW + timedelta(hours=36))
+    assert upcoming_counts(venue, artist) == (1, 1)
+    flags = {show.start_time: show.upcoming for show in Show.query}
+    assert flags == {NOW + timedelta(days=1): False, NOW + timedelta(days=2): True, None: False}
@@ -0,0 +1,45 @@
+from datetime import datetime
+
+import babel.dates
+import dateutil.parser
+import pytest
+
+import dates
+
+VALUES = [
+    '2031-03-01T20:00:00',
+    '2031-03-01 09:05',
+    '2019-06-15T23:59:59.5',
+    'Sat, 01 Mar 2031 20:00',
+    'March 1 2031 8pm',
+]
+FORMATS = ['full', 'medium', 'long', 'short', 'yyyy-MM-dd HH:mm']
+
+
+def reference(value, format='medium'):
+    # the filter as it was before the cached version
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format, locale='en')
+
+
+@pytest.mark.parametrize('format', FORMATS)
+@pytest.mark.parametrize('value', VALUES)
+def test_same_output_as_before(value, format):
+    assert dates.format_datetime(value, format) == reference(value, format)
+    # datetime values (what /shows now passes) format like their string form
+    assert dates.format_datetime(dateutil.parser.parse(value), format) == reference(value, format)
+
+
+@pytest.mark.parametrize('format', FORMATS)
+def test_format_all_matches_one_by_one(format):
+    values = VALUES + VALUES[:2] + [datetime(2031, 3, 1, 20, 0)]
+    assert dates.format_all(values, format) == [dates.format_datetime(value, format) for value in values]
+
+
+def test_template_filter(app):
+    rendered = app.jinja_env.from_string('{{ value|datetime("full") }}').render(value=VALUES[0])
+    assert rendered == reference(VALUES[0], 'full')
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, Area, Venue, Artist, Show
+
+EDIT = {'genres': 'Jazz', 'address': '1 Main St', 'city': 'San Francisco', 'state': 'CA',
+        'phone': '326-123-5000', 'website': '', 'facebook_link': '', 'seeking_talent': 'n',
+        'seeking_description': '', 'image_link': ''}
+
+
+@pytest.fixture
+def booked(app):
+    area = Area(city='San Francisco', state='CA')
+    db.session.add(area)
+    db.session.flush()
+    venue = Venue(name='The Blue Note', area_id=area.id, num_upcoming_shows=1)
+    artist = Artist(name='Quiet Trio', area_id=area.id, num_upcoming_shows=1)
+    db.session.add_all([venue, artist])
+    db.session.flush()
+    start = datetime.now() + timedelta(days=7)
+    db.session.add(Show(venue_id=venue.id, artist_id=artist.id, start_time=start,
+                        end_time=start + timedelta(hours=2), upcoming=True))
+    db.session.commit()
+    return venue.id, artist.id
+
+
+def test_venue_edit_invalidates_both_detail_pages(app, client, booked):
+    venue_id, artist_id = booked
+    cache = app.extensions['detail_cache']
+    assert b'The Blue Note' in client.get(f'/venues/{venue_id}').data
+    assert b'The Blue Note' in client.get(f'/artists/{artist_id}').data
+    assert cache.get(f'venue:{venue_id}') and cache.get(f'artist:{artist_id}')
+
+    response = client.post(f'/venues/{venue_id}/edit', json=dict(EDIT, name='The Green Note'))
+    assert response.status_code == 200
+    # the venue and every artist who plays there
+    assert cache.get(f'venue:{venue_id}') is None
+    assert cache.get(f'artist:{artist_id}') is None
+    assert b'The Green Note' in client.get(f'/venues/{venue_id}').data
+    assert b'The Green Note' in client.get(f'/artists/{artist_id}').data
+
+
+def test_cached_payload_is_reused_until_a_write(app, client, booked, statements):
+    venue_id, artist_id = booked
+    client.get(f'/venues/{venue_id}')
+    del statements[:]
+    assert client.get(f'/venues/{venue_id}').status_code == 200
+    # only the validators; the payload came from the cache
+    assert len(statements) == 1
@@ -0,0 +1,74 @@
+import directory
+from models import db, Area, Venue
+
+
+def add_venues(*names):
+    area = Area(city='San Francisco', state='CA')
+    db.session.add(area)
+    db.session.flush()
+    venues = [Venue(name=name, area_id=area.id, num_upcoming_shows=0) for name in names]
+    db.session.add_all(venues)
+    db.session.commit()
+    directory.refresh()
+    db.session.commit()
+    return venues
+
+
+def page(client):
+    response = client.get('/venues')
+    assert response.status_code == 200
+    return response.headers['ETag'], response.get_data(as_text=True)
+
+
+def test_refresh_publishes_renames_and_deletes(client):
+    blue_note, red_room = add_venues('The Blue Note', 'Red Room')
+    etag, html = page(client)
+    assert 'The Blue Note' in html and 'Red Room' in html
+
+    blue_note.name = 'The Green Note'
+    db.session.commit()
+    # read from the summary, so unchanged until it is refreshed
+    assert page(client) == (etag, html)
+    directory.refresh()
+    db.session.commit()
+    renamed_etag, html = page(client)
+    assert renamed_etag != etag
+    assert 'The Green Note' in html and 'The Blue Note' not in html
+    assert client.get('/venues', headers={'If-None-Match': etag}).status_code == 200
+    assert client.get('/venues', headers={'If-None-Match': renamed_etag}).status_code == 304
+
+    db.session.delete(red_room)
+    db.session.commit()
+    directory.refresh()
+    db.session.commit()
+    deleted_etag, html = page(client)
+    assert deleted_etag != renamed_etag
+    assert 'Red Room' not in html
+
+
+def test_commits_schedule_one_debounced_refresh(app, client):
+    blue_note, red_room = add_venues('The Blue Note', 'Red Room')
+    etag, _ = page(client)
+    app.config['DIRECTORY_REFRESH_DELAY'] = 0.2
+
+    blue_note.name = 'The Green Note'
+    db.session.commit()
+    timer = directory._pending
+    assert timer is not None
+    db.session.delete(red_room)
+    db.session.commit()
+    # the second write shares the pending refresh
+    assert directory._pending is timer
+    timer.join(5)
+    assert not timer.is_alive() and directory._pending is None
+
+    new_etag, html = page(client)
+    assert new_etag != etag
+    assert 'The Green Note' in html and 'Red Room' not in html
+
+
+def test_no_refresh_without_tracked_writes(app):
+    add_venues('The Blue Note')
+    app.config['DIRECTORY_REFRESH_DELAY'] = 0.2
+    db.session.commit()
+    assert directory._pending is None
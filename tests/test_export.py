@@ -0,0 +1,59 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+import exporter
+import importer
+import seed
+from models import db, Venue, Show
+
+
+@pytest.fixture
+def seeded(app, monkeypatch):
+    seed.seed(60, report=lambda message: None)
+    # several chunks even for a small catalog
+    monkeypatch.setattr(exporter, 'EXPORT_BATCH_SIZE', 7)
+
+
+def get(client, path):
+    response = client.get(path)
+    assert response.status_code == 200 and response.is_streamed
+    chunks = list(response.response)
+    return response, chunks, b''.join(chunks)
+
+
+def test_csv(client, seeded):
+    response, chunks, body = get(client, '/export/venues')
+    assert response.mimetype == 'text/csv'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=venues.csv'
+    assert len(chunks) > 1
+    rows = list(csv.DictReader(io.StringIO(body.decode())))
+    assert [int(row['id']) for row in rows] == [id for id, in db.session.query(Venue.id).order_by(Venue.id)]
+    # the columns `flask import venues` reads back
+    assert set(rows[0]) == set(importer.FIELDS['venues']) | {'city', 'state'}
+
+
+def test_jsonl_matches_the_database(client, seeded):
+    response, chunks, body = get(client, '/export/shows?format=jsonl')
+    assert response.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in body.decode().splitlines()]
+    expected = [{'id': show.id, 'venue_id': show.venue_id, 'artist_id': show.artist_id,
+                 'start_time': show.start_time.isoformat(), 'end_time': show.end_time.isoformat()}
+                for show in Show.query.order_by(Show.id)]
+    assert rows == expected
+
+
+def test_gzip_is_the_same_export(client, seeded):
+    _, _, plain = get(client, '/export/artists')
+    response, chunks, body = get(client, '/export/artists?gzip=1')
+    assert response.mimetype == 'application/gzip'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=artists.csv.gz'
+    assert gzip.decompress(body) == plain
+
+
+def test_unknown_format(client):
+    assert client.get('/export/shows?format=xml').status_code == 400
+    assert client.get('/export/areas').status_code == 404
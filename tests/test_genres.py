@@ -0,0 +1,95 @@
+import pytest
+
+import directory
+import genres
+from models import db, Area, Genre, Venue, Artist, venue_genre, artist_genre
+
+
+def linked(model, owner_id):
+    table, owner_column = genres.ASSOCIATIONS[model]
+    return set(db.session.scalars(
+        db.select(Genre.name).join(table, table.c.genre_id == Genre.id).where(owner_column == owner_id)))
+
+
+def add(model, name, genre_names):
+    area = Area.query.first() or Area(city='San Francisco', state='CA')
+    db.session.add(area)
+    db.session.flush()
+    row = model(name=name, area_id=area.id, genres=genre_names, num_upcoming_shows=0)
+    db.session.add(row)
+    db.session.commit()
+    return row
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('Jazz, Blues', ['Jazz', 'Blues']),
+    (['Jazz', ' Blues ', 'Jazz'], ['Jazz', 'Blues']),
+    ('{Jazz,"Rock n Roll"}', ['Jazz', 'Rock n Roll']),
+    (' , ', []),
+    (None, []),
+])
+def test_parse(value, expected):
+    assert genres.parse(value) == expected
+
+
+@pytest.mark.parametrize('model', [Venue, Artist])
+def test_links_follow_edits_and_deletes(app, model):
+    row = add(model, 'The Blue Note', 'Jazz,Blues')
+    assert linked(model, row.id) == {'Jazz', 'Blues'}
+
+    row.genres = 'Blues, Funk'
+    db.session.commit()
+    assert linked(model, row.id) == {'Blues', 'Funk'}
+
+    # a change to another column leaves the links alone
+    row.name = 'The Green Note'
+    db.session.commit()
+    assert linked(model, row.id) == {'Blues', 'Funk'}
+
+    row_id = row.id
+    db.session.delete(row)
+    db.session.commit()
+    assert linked(model, row_id) == set()
+
+
+def test_venue_delete_route_unlinks(client):
+    venue = add(Venue, 'The Blue Note', 'Jazz')
+    venue_id = venue.id
+    assert client.delete(f'/venues/{venue_id}').get_json() == {'success': True}
+    assert db.session.scalar(db.select(db.func.count()).select_from(venue_genre)) == 0
+
+
+@pytest.mark.parametrize('path, model', [('/venues', Venue), ('/artists', Artist)])
+def test_genre_filter(app, client, path, model):
+    add(model, 'Blue Note Jazz', 'Jazz,Blues')
+    add(model, 'Red Room Rock', 'Rock n Roll')
+    jazz_only = add(model, 'Velvet Jazz', 'Jazz')
+    if model is Venue:
+        directory.refresh()
+        db.session.commit()
+    html = client.get(path, query_string={'genre': 'Jazz'}).get_data(as_text=True)
+    assert 'Blue Note Jazz' in html and 'Velvet Jazz' in html and 'Red Room Rock' not in html
+
+    jazz_only.genres = 'Blues'
+    db.session.commit()
+    html = client.get(path, query_string={'genre': 'Jazz'}).get_data(as_text=True)
+    assert 'Blue Note Jazz' in html and 'Velvet Jazz' not in html
+    assert 'Velvet Jazz' in client.get(path, query_string={'genre': 'Blues'}).get_data(as_text=True)
+
+
+def test_link_missing_after_bulk_insert(app):
+    area = Area(city='San Francisco', state='CA')
+    db.session.add(area)
+    db.session.commit()
+    db.session.execute(db.insert(Artist), [
+        {'name': 'Quiet Trio', 'area_id': area.id, 'genres': 'Jazz', 'num_upcoming_shows': 0},
+        {'name': 'Neon Band', 'area_id': area.id, 'genres': 'Pop,Funk', 'num_upcoming_shows': 0},
+        {'name': 'Nameless', 'area_id': area.id, 'genres': ' , ', 'num_upcoming_shows': 0},
+    ])
+    db.session.commit()
+    assert db.session.scalar(db.select(db.func.count()).select_from(artist_genre)) == 0
+    assert genres.link_missing(Artist, batch_size=2) == 2
+    db.session.commit()
+    neon = Artist.query.filter_by(name='Neon Band').one()
+    assert linked(Artist, neon.id) == {'Pop', 'Funk'}
+    assert genres.link_missing(Artist) == 0
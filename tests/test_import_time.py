@@ -0,0 +1,7 @@
+import app
+
+
+def test_app_imports_within_budget():
+    elapsed, eager = app.measure_import()
+    assert eager == []
+    assert elapsed <= app.IMPORT_TIME_BUDGET_MS, f'import app took {elapsed:.0f}ms'
@@ -0,0 +1,108 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import importer
+import search
+from models import db, Area, Venue, Artist, Show
+
+# Runs the executemany path on SQLite and COPY when TEST_DATABASE_URL is a
+# Postgres database.
+
+
+def write_csv(path, rows):
+    fields = sorted({field for row in rows for field in row})
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fields)
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
+
+
+def run_import(kind, path, fmt='csv'):
+    return importer.import_rows(kind, importer.read_rows(path, fmt), batch_size=2,
+                                report=lambda message: None)
+
+
+def import_owners(tmp_path):
+    run_import('venues', write_csv(tmp_path / 'venues.csv', [
+        {'name': 'The Blue Note', 'city': 'San Francisco', 'state': 'CA', 'genres': 'Jazz,Blues',
+         'seeking_talent': 'y', 'phone': ''},
+        {'id': '40', 'name': 'Red Room', 'city': 'Portland', 'state': 'OR', 'genres': 'Rock n Roll'},
+        {'name': 'Velvet Lounge', 'city': 'San Francisco', 'state': 'CA', 'genres': 'Jazz'},
+    ]))
+    with open(tmp_path / 'artists.jsonl', 'w') as f:
+        for row in ({'name': 'Quiet Trio', 'city': 'Portland', 'state': 'OR', 'genres': 'Jazz'},
+                    {'name': 'Neon Band', 'city': 'Austin', 'state': 'TX', 'genres': 'Pop'}):
+            f.write(json.dumps(row) + '\n')
+    run_import('artists', tmp_path / 'artists.jsonl', 'jsonl')
+
+
+def test_venues_and_artists(app, tmp_path):
+    import_owners(tmp_path)
+    assert Venue.query.count() == 3 and Artist.query.count() == 2
+    assert {(area.city, area.state) for area in Area.query} == {
+        ('San Francisco', 'CA'), ('Portland', 'OR'), ('Austin', 'TX')}
+    red_room = db.session.get(Venue, 40)
+    assert red_room.name == 'Red Room' and red_room.seeking_talent is False
+    blue_note = Venue.query.filter_by(name='The Blue Note').one()
+    assert blue_note.seeking_talent is True
+    # empty fields are stored as NULL on both paths
+    assert blue_note.phone is None
+    # the genre index and the search index follow the bulk load
+    assert app.test_client().get('/venues?genre=Jazz').get_data(as_text=True).count('href="/venues/') == 2
+    assert [row.name for row in search.search(Artist, 'neon')] == ['Neon Band']
+
+
+def test_shows_mix_optional_columns(app, tmp_path):
+    import_owners(tmp_path)
+    venue_id = db.session.query(Venue.id).filter_by(name='Red Room').scalar()
+    artist_id = db.session.query(Artist.id).filter_by(name='Quiet Trio').scalar()
+    later = (datetime.now() + timedelta(days=30)).replace(microsecond=0)
+    run_import('shows', write_csv(tmp_path / 'shows.csv', [
+        {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': '2020-01-01 20:00'},
+        {'id': '900', 'venue_id': venue_id, 'artist_id': artist_id,
+         'start_time': later.isoformat(), 'end_time': (later + timedelta(hours=1)).isoformat()},
+        {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': '2020-01-02 20:00',
+         'end_time': ''},
+    ]))
+    shows = Show.query.order_by(Show.start_time).all()
+    assert [show.end_time - show.start_time for show in shows] == [
+        timedelta(hours=2), timedelta(hours=2), timedelta(hours=1)]
+    assert shows[-1].id == 900 and shows[-1].upcoming
+    assert db.session.get(Venue, venue_id).num_upcoming_shows == 1
+
+
+def test_times_with_an_offset_are_stored_as_local_time(app, tmp_path):
+    import_owners(tmp_path)
+    start = datetime(2031, 3, 1, 18, 30, tzinfo=timezone.utc)
+    run_import('shows', write_csv(tmp_path / 'shows.csv', [
+        {'venue_id': 40, 'artist_id': 1, 'start_time': start.isoformat().replace('+00:00', 'Z')},
+    ]))
+    show = Show.query.one()
+    assert show.start_time == start.astimezone().replace(tzinfo=None)
+    assert show.upcoming
+
+
+def test_end_time_past_max_duration_stops_the_import(app, tmp_path):
+    import_owners(tmp_path)
+    path = write_csv(tmp_path / 'shows.csv', [
+        {'venue_id': 40, 'artist_id': 1, 'start_time': '2031-03-01 18:00',
+         'end_time': '2031-03-03 18:00'},
+    ])
+    with pytest.raises(ValueError, match='end_time'):
+        run_import('shows', path)
+
+
+def test_copy_text_keeps_null_and_empty_apart():
+    text = importer.copy_text(['a', 'b', 'c', 'd', 'e', 'f'], [
+        {'a': None, 'b': '', 'c': 1, 'd': True, 'e': 'say "hi"', 'f': '\\N'},
+        {'c': 2, 'd': False, 'e': datetime(2031, 3, 1, 18, 30)},
+    ])
+    assert text == ('\\N,"",1,true,"say ""hi""","\\N"\n'
+                    '\\N,\\N,2,false,"2031-03-01 18:30:00",\\N\n')
+    # quoted fields read back as written
+    assert next(csv.reader(io.StringIO(text)))[1:] == ['', '1', 'true', 'say "hi"', '\\N']
@@ -0,0 +1,56 @@
+import re
+
+import pytest
+
+import seed
+from instrumentation import RepeatedQueryError
+from models import db, Venue
+
+SERVER_TIMING = re.compile(
+    r'db;dur=[\d.]+;desc="(\d+) queries", render;dur=[\d.]+, total;dur=[\d.]+')
+
+
+def test_server_timing_header(client, statements):
+    seed.seed(50, report=lambda message: None)
+    del statements[:]
+    response = client.get('/artists')
+    match = SERVER_TIMING.fullmatch(response.headers['Server-Timing'])
+    assert match and int(match.group(1)) == len(statements)
+
+
+def test_counts_start_over_for_every_request(app, client):
+    # the fixture keeps one app context pushed, so every request here shares g
+    seed.seed(50, report=lambda message: None)
+    threshold = app.config['SQL_REPEAT_THRESHOLD']
+    for _ in range(threshold * 2):
+        for path in ('/venues', '/venues/1', '/shows'):
+            assert client.get(path).status_code == 200
+    counts = {int(SERVER_TIMING.fullmatch(client.get('/artists').headers['Server-Timing']).group(1))
+              for _ in range(3)}
+    assert len(counts) == 1
+
+
+def test_repeated_select_raises(app, client):
+    threshold = app.config['SQL_REPEAT_THRESHOLD']
+
+    @app.route('/n-plus-one')
+    def n_plus_one():
+        for venue_id in range(threshold + 1):
+            db.session.get(Venue, venue_id + 1)
+        return ''
+
+    assert app.config['SQL_REPEAT_RAISE']
+    with pytest.raises(RepeatedQueryError, match='/n-plus-one'):
+        client.get('/n-plus-one')
+
+
+def test_repeated_select_under_threshold_passes(app, client):
+    threshold = app.config['SQL_REPEAT_THRESHOLD']
+
+    @app.route('/few-lookups')
+    def few_lookups():
+        for venue_id in range(threshold):
+            db.session.get(Venue, venue_id + 1)
+        return ''
+
+    assert client.get('/few-lookups').status_code == 200
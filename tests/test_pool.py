@@ -0,0 +1,102 @@
+from sqlalchemy.pool import NullPool
+
+import pool
+from app import create_app
+from conftest import make_config
+from models import db
+
+POSTGRES_URL = 'postgresql://postgres@localhost:5432/fyyur'
+
+
+def test_transaction_mode_skips_pre_ping():
+    options = pool.engine_options(make_config(
+        SQLALCHEMY_DATABASE_URI=POSTGRES_URL, DB_POOL_MODE='transaction').__dict__)
+    assert options['poolclass'] is NullPool
+    assert 'pool_pre_ping' not in options
+
+
+def test_session_mode_pre_pings():
+    options = pool.engine_options(make_config(
+        SQLALCHEMY_DATABASE_URI=POSTGRES_URL, DB_POOL_MODE='session').__dict__)
+    assert options['pool_pre_ping'] is True
+
+
+def test_timeout_listener_is_attached_once(tmp_path):
+    for index in range(3):
+        app = create_app(make_config(
+            SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path}/{index}.db',
+            DB_POOL_MODE='transaction',
+            DIRECTORY_REFRESH_DELAY=None,
+            TEMPLATE_CACHE_DIR=None,
+        ))
+    with app.app_context():
+        listeners = list(db.session().dispatch.after_begin)
+    assert listeners.count(pool.set_statement_timeout) == 1
+
+
+class FakeConnection:
+    # records what the pool hook sends on a raw DBAPI connection
+
+    def __init__(self):
+        self.sent = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, statement):
+        self.sent.append(statement)
+
+    def close(self):
+        pass
+
+    def commit(self):
+        self.sent.append('COMMIT')
+
+
+class Record:
+
+    def __init__(self):
+        self.info = {}
+
+
+def test_session_mode_sets_no_connect_time_timeout():
+    options = pool.engine_options(make_config(
+        SQLALCHEMY_DATABASE_URI=POSTGRES_URL, DB_POOL_MODE='session',
+        DB_STATEMENT_TIMEOUT_MS=5000).__dict__)
+    assert 'connect_args' not in options
+
+
+def test_timeout_applies_to_requests_only(app):
+    app.config.update(DB_POOL_MODE='session', DB_STATEMENT_TIMEOUT_MS=5000)
+    connection, record = FakeConnection(), Record()
+
+    # CLI / migration work on a fresh connection: server default, nothing sent
+    pool.set_connection_timeout(connection, record, None)
+    assert connection.sent == []
+
+    with app.test_request_context('/venues'):
+        pool.set_connection_timeout(connection, record, None)
+        pool.set_connection_timeout(connection, record, None)
+    assert connection.sent == ['SET statement_timeout = 5000', 'COMMIT']
+
+    del connection.sent[:]
+    pool.set_connection_timeout(connection, record, None)
+    assert connection.sent == ['SET statement_timeout = DEFAULT', 'COMMIT']
+
+
+def test_transaction_mode_sets_local_timeout_in_requests_only(app):
+    app.config.update(DB_POOL_MODE='transaction', DB_STATEMENT_TIMEOUT_MS=5000)
+    sent = []
+
+    class Connection:
+        class dialect:
+            name = 'postgresql'
+
+        def exec_driver_sql(self, statement):
+            sent.append(statement)
+
+    pool.set_statement_timeout(None, None, Connection())
+    assert sent == []
+    with app.test_request_context('/venues'):
+        pool.set_statement_timeout(None, None, Connection())
+    assert sent == ['SET LOCAL statement_timeout = 5000']
@@ -0,0 +1,136 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as views
+import bookings
+import directory
+import genres
+import seed
+from models import db, Area, Venue, Artist, Show
+
+# Every hot lookup must be an index search, and the full listings an ordered
+# index scan rather than a table scan and sort. The plans are read on a
+# seeded dataset; on Postgres sequential scans are switched off first, so one
+# that still shows up means no usable index exists, not that the planner
+# preferred it for a small table.
+
+SEED_SHOWS = 2000
+
+
+def hot_statements(venue_id, artist_id, city, state, now):
+    # name -> (statement, the index it must be served from)
+    venue_shows = Show.venue_id == venue_id
+    overlap = (now, now + timedelta(hours=2))
+    return {
+        'venue past shows': (views.venue_shows(venue_id).where(Show.start_time < now),
+                             'ix_show_venue_id_start_time'),
+        'venue upcoming shows': (views.venue_shows(venue_id).where(Show.start_time >= now),
+                                 'ix_show_venue_id_start_time'),
+        'artist past shows': (views.artist_shows(artist_id).where(Show.start_time < now),
+                              'ix_show_artist_id_start_time'),
+        'artist upcoming shows': (views.artist_shows(artist_id).where(Show.start_time >= now),
+                                  'ix_show_artist_id_start_time'),
+        'venue show validators': (db.select(db.func.count(Show.id)).where(
+            venue_shows, Show.start_time < now), 'ix_show_venue_id_start_time'),
+        'area by city and state': (db.select(Area.id).where(Area.city == city, Area.state == state),
+                                   'area'),
+        'venues in an area': (db.select(Venue.id).where(Venue.area_id == 1), 'ix_venue_area_id'),
+        'artists in an area': (db.select(Artist.id).where(Artist.area_id == 1), 'ix_artist_area_id'),
+        'venue booking overlap': (db.select(Show.id).where(
+            bookings.overlapping(Show.venue_id, venue_id, *overlap)), 'ix_show_venue_id_start_time'),
+        'artist booking overlap': (db.select(Show.id).where(
+            bookings.overlapping(Show.artist_id, artist_id, *overlap)), 'ix_show_artist_id_start_time'),
+        'venues by genre': (db.select(Venue.id).where(Venue.id.in_(genres.owners(Venue, 'Jazz'))),
+                            'venue_genre'),
+        'upcoming shows that started': (db.select(Show.id).where(Show.upcoming, Show.start_time <= now),
+                                        'ix_show_upcoming_start_time'),
+    }
+
+
+def listing_statements():
+    # read whole, but in index order
+    return {
+        'shows in start order': (db.select(Show.id, Show.start_time).order_by(Show.start_time),
+                                 'ix_show_start_time'),
+        'venue directory': (directory.statement(), 'area_directory'),
+    }
+
+
+def explain(connection, statement):
+    compiled = statement.compile(dialect=connection.dialect)
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    if connection.dialect.name == 'postgresql':
+        plan = connection.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + compiled.string, params).scalar()
+        return plan if isinstance(plan, list) else json.loads(plan)
+    return connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + compiled.string, params).all()
+
+
+def indexes_used(connection, plan):
+    # one string naming every index the plan reads through
+    if connection.dialect.name == 'postgresql':
+        found = []
+
+        def walk(node):
+            if 'Index Name' in node:
+                found.append(node['Index Name'])
+            for child in node.get('Plans', []):
+                walk(child)
+        walk(plan[0]['Plan'])
+        return ' '.join(found)
+    # 'SEARCH show USING INDEX ix_show_venue_id_start_time (venue_id=? AND ...)';
+    # unique constraints show up as sqlite_autoindex_<table>_N
+    return ' '.join(row[-1].split(' (')[0] for row in plan if ' INDEX ' in row[-1])
+
+
+def full_scans(connection, plan, listing=False):
+    # tables read whole (or, for lookups, whole indexes); a listing may scan
+    # an index in order but must not scan the table and sort
+    if connection.dialect.name == 'postgresql':
+        found = []
+
+        def walk(node):
+            kind = node['Node Type']
+            if kind == 'Seq Scan' or (listing and kind == 'Sort') or (
+                    not listing and kind in ('Index Scan', 'Index Only Scan')
+                    and 'Index Cond' not in node):
+                found.append(kind + ' ' + node.get('Relation Name', ''))
+            for child in node.get('Plans', []):
+                walk(child)
+        walk(plan[0]['Plan'])
+        return found
+    details = [row[-1] for row in plan]
+    return [detail for detail in details
+            if (listing and detail.startswith('USE TEMP B-TREE'))
+            or (detail.startswith('SCAN ') and detail != 'SCAN CONSTANT ROW'
+                and (not listing or ' USING ' not in detail))]
+
+
+@pytest.fixture
+def seeded(app):
+    seed.seed(SEED_SHOWS, report=lambda message: None)
+    venue_id, artist_id = db.session.query(Show.venue_id, Show.artist_id).first()
+    city, state = db.session.query(Area.city, Area.state).first()
+    return venue_id, artist_id, city, state
+
+
+def test_hot_queries_use_indexes(app, seeded):
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        connection.exec_driver_sql('ANALYZE')
+        connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+    failures = {}
+    for listing, statements in ((False, hot_statements(*seeded, datetime.now())),
+                                (True, listing_statements())):
+        for name, (statement, index) in statements.items():
+            plan = explain(connection, statement)
+            problems = full_scans(connection, plan, listing)
+            used = indexes_used(connection, plan)
+            if index not in used:
+                problems.append(f'expected {index}, used: {used or "no index"}')
+            if problems:
+                failures[name] = problems
+    assert failures == {}
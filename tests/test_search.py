@@ -0,0 +1,88 @@
+import pytest
+
+import search
+from models import db, Area, Venue, Artist
+
+# The same cases run on SQLite (FTS5 trigram table) and on Postgres (tsvector
+# and pg_trgm indexes) when TEST_DATABASE_URL is set.
+
+MODELS = [Venue, Artist]
+
+
+def add(model, *names):
+    area = Area.query.first()
+    if area is None:
+        area = Area(city='San Francisco', state='CA')
+        db.session.add(area)
+        db.session.flush()
+    for name in names:
+        db.session.add(model(name=name, area_id=area.id, num_upcoming_shows=0))
+    db.session.commit()
+
+
+def names(model, term):
+    return [row.name for row in search.search(model, term)]
+
+
+@pytest.mark.parametrize('model', MODELS)
+def test_whole_word_match_ranks_first(app, model):
+    add(model, 'Bluegrass Hall and Saloon', 'The Blue Note', 'Red Room')
+    assert names(model, 'blue') == ['The Blue Note', 'Bluegrass Hall and Saloon']
+
+
+@pytest.mark.parametrize('model', MODELS)
+def test_case_insensitive_substring(app, model):
+    add(model, 'Bluegrass Hall', 'The Blue Note', 'Red Room')
+    assert set(names(model, 'EGRA')) == {'Bluegrass Hall'}
+    assert set(names(model, 'BLUE')) == {'Bluegrass Hall', 'The Blue Note'}
+
+
+@pytest.mark.parametrize('model', MODELS)
+def test_short_term_falls_back_to_like(app, model):
+    assert len('ue') < search.FTS_MIN_TERM_LENGTH
+    add(model, 'Bluegrass Hall', 'The Blue Note', 'Red Room')
+    assert set(names(model, 'ue')) == {'Bluegrass Hall', 'The Blue Note'}
+    assert set(names(model, 'Ro')) == {'Red Room'}
+
+
+@pytest.mark.parametrize('model', MODELS)
+@pytest.mark.parametrize('term, expected', [
+    ('0%', {'100% Rock'}),
+    ('00%', {'100% Rock'}),
+    ('r_s', {'Under_score'}),
+    ('_', {'Under_score'}),
+    ('C/D', {'AC/DC Tribute'}),
+    ('"', {'The "Quoted" Bar'}),
+])
+def test_wildcards_are_literal(app, model, term, expected):
+    add(model, '100% Rock', '1000 Rock Club', 'Under_score', 'Underscore Lounge',
+        'AC/DC Tribute', 'ACDC Tribute', 'The "Quoted" Bar')
+    assert set(names(model, term)) == expected
+
+
+@pytest.mark.parametrize('model', MODELS)
+def test_index_follows_renames_and_deletes(app, model):
+    add(model, 'The Blue Note', 'Red Room')
+    row = model.query.filter_by(name='The Blue Note').one()
+    row.name = 'The Green Note'
+    db.session.commit()
+    assert names(model, 'blue') == []
+    assert names(model, 'green') == ['The Green Note']
+
+    db.session.delete(model.query.filter_by(name='Red Room').one())
+    db.session.commit()
+    assert names(model, 'room') == []
+
+
+@pytest.mark.parametrize('model', MODELS)
+def test_empty_term_lists_everything(app, model):
+    add(model, 'The Blue Note', 'Red Room')
+    assert names(model, '  ') == ['The Blue Note', 'Red Room']
+
+
+def test_search_page(client):
+    add(Venue, 'The Blue Note', 'Red Room')
+    response = client.post('/venues/search', data={'search_term': 'blue'})
+    assert response.status_code == 200
+    assert b'The Blue Note' in response.data
+    assert b'Red Room' not in response.data
@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+
+import config
+from app import create_app
+from conftest import make_config
+
+
+def test_cache_is_off_by_default():
+    # imported fresh in a child process: reloading config here would hand
+    # every later test a different module, SECRET_KEY included
+    env = {name: value for name, value in os.environ.items() if name != 'TEMPLATE_CACHE_DIR'}
+    default = subprocess.run(
+        [sys.executable, '-c', 'import config; print(config.TEMPLATE_CACHE_DIR)'],
+        capture_output=True, text=True, check=True, env=env,
+        cwd=os.path.dirname(os.path.abspath(config.__file__))).stdout.strip()
+    assert default == 'None'
+
+
+def test_unwritable_cache_dir_is_skipped(tmp_path):
+    # a directory that can't be created (here: below a regular file) must not
+    # stop the app from starting or rendering
+    blocker = tmp_path / 'file'
+    blocker.write_text('')
+    app = create_app(make_config(
+        SQLALCHEMY_DATABASE_URI='sqlite:///' + str(tmp_path / 'test.db'),
+        TESTING=True,
+        TEMPLATE_CACHE_DIR=str(blocker / 'cache'),
+        DIRECTORY_REFRESH_DELAY=None,
+    ))
+    assert app.jinja_env.bytecode_cache is None
+    assert app.test_client().get('/').status_code == 200
+
+
+def test_failed_cache_write_still_renders(tmp_path, monkeypatch):
+    app = create_app(make_config(
+        SQLALCHEMY_DATABASE_URI='sqlite:///' + str(tmp_path / 'test.db'),
+        TESTING=True,
+        TEMPLATE_CACHE_DIR=str(tmp_path / 'cache'),
+        DIRECTORY_REFRESH_DELAY=None,
+    ))
+
+    def read_only(*args, **kwargs):
+        raise PermissionError('read-only file system')
+    monkeypatch.setattr('tempfile.NamedTemporaryFile', read_only)
+    assert app.test_client().get('/').status_code == 200
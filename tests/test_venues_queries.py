@@ -0,0 +1,28 @@
+import pytest
+
+import seed
+from models import Venue
+
+# /venues must cost the same few statements however big the catalog is: one
+# for the ETag validators and one for the listing.
+
+MAX_STATEMENTS = 2
+
+
+def page_statements(client, statements, path):
+    del statements[:]
+    response = client.get(path)
+    assert response.status_code == 200
+    return len(statements), response.get_data(as_text=True)
+
+
+@pytest.mark.parametrize('path', ['/venues', '/venues?genre=Jazz'])
+def test_venues_statement_count_is_flat(client, statements, path):
+    counts = []
+    for shows in (200, 2000):
+        seed.seed(shows, report=lambda message: None)
+        count, page = page_statements(client, statements, path)
+        counts.append(count)
+        if path == '/venues':
+            assert page.count('href="/venues/') == Venue.query.count()
+    assert counts[0] == counts[1] <= MAX_STATEMENTS